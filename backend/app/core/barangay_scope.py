@@ -0,0 +1,61 @@
+import re
+
+# Known spellings of barangay names -> label stored on resident records
+BARANGAY_MAPPING = {
+    "faranal": "FARAÑAL",
+    "santo_nino": "STO NIÑO",
+    "santonino": "STO NIÑO",
+    "sto_nino": "STO NIÑO",
+    "sto nino": "STO NIÑO",
+    "sto niño": "STO NIÑO",
+    "santo nino": "STO NIÑO",
+    "santo niño": "STO NIÑO",
+    "rosete": "ROSETE",
+    "amagna": "AMAGNA",
+    "apostol": "APOSTOL",
+    "balincaguing": "BALINCAGUING",
+    "maloma": "MALOMA",
+    "sindol": "SINDOL",
+    "sanrafael": "SAN RAFAEL",
+    "san rafael": "SAN RAFAEL",
+}
+
+
+def normalize_name(name: str):
+    """'Santo Niño', 'santo_nino' and 'SANTO NINO' all become 'santonino'."""
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower().replace("ñ", "n"))
+
+
+_LABELS = {normalize_name(key): label for key, label in BARANGAY_MAPPING.items()}
+
+
+def resident_barangay_label(name: str):
+    """Barangay value as stored on resident records (e.g. 'Santo Niño' -> 'STO NIÑO')."""
+    if not name:
+        return None
+    return _LABELS.get(normalize_name(name), name.strip().upper())
+
+
+def match_barangay(barangays, username: str):
+    """
+    Finds the Barangay a barangay account belongs to from its username,
+    accepting any known spelling of the barangay name. Resolved once when
+    the account is created (or first logs in) and stored on the user.
+    """
+    key = normalize_name(username)
+
+    for barangay in barangays:
+        label = resident_barangay_label(barangay.name)
+        spellings = {normalize_name(barangay.name), normalize_name(label)}
+        spellings.update(k for k, v in _LABELS.items() if v == label)
+
+        if any(s and s in key for s in spellings):
+            return barangay
+
+    return None
+
+
+def fallback_barangay_label(username: str):
+    # Accounts that match no Barangay row keep the old behaviour of using
+    # the username itself as the barangay.
+    return username.replace("_", " ").strip().upper()
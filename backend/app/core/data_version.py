@@ -0,0 +1,55 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app import models
+
+ALL_BARANGAYS = "*"
+
+
+def version_key(barangay: str = None):
+    if not barangay or not barangay.strip():
+        return ALL_BARANGAYS
+    return barangay.strip().upper()
+
+
+def bump_data_version(db: Session, *barangays: str):
+    """
+    Marks the resident data of the given barangays (and so the
+    all-barangay list) as changed. Runs inside the caller's transaction;
+    the bumped keys are kept on the session so listeners can react after
+    commit.
+
+    Only the barangays' own rows are written. The all-barangay version
+    is derived from them (see get_data_version) rather than kept in a
+    shared row, which would serialize every resident write behind one
+    row lock until commit.
+    """
+    keys = {version_key(b) for b in barangays} or {ALL_BARANGAYS}
+
+    for key in sorted(keys):
+        stmt = insert(models.ExportVersion).values(barangay=key, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["barangay"],
+            set_={
+                "version": models.ExportVersion.version + 1,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+
+    db.info.setdefault("bumped_barangays", set()).update(keys | {ALL_BARANGAYS})
+
+
+def get_data_version(db: Session, barangay: str = None):
+    key = version_key(barangay)
+
+    if key == ALL_BARANGAYS:
+        # Versions only grow, so their sum changes whenever any barangay
+        # (or a resident without one, kept under "*") is bumped.
+        version = db.query(func.sum(models.ExportVersion.version)).scalar()
+    else:
+        version = db.query(models.ExportVersion.version).filter(
+            models.ExportVersion.barangay == key
+        ).scalar()
+
+    return version or 0
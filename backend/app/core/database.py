@@ -1,7 +1,14 @@
 import os
+from fastapi import Request
+from fastapi.routing import APIRoute
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.core.metrics import TimedQueuePool, TimedAsyncQueuePool, instrument_engine
+from app.core import slow_queries
 from dotenv import load_dotenv
 
 # Load .env locally
@@ -13,15 +20,40 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set.")
 
-print("Connecting to database...")
+# Optional read-only endpoint (replica, or the same server under a
+# read-only role). Heavy reads go here so they don't take connections
+# from the write path; without it reads share the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+def pool_options(prefix: str = "DB"):
+    # e.g. DB_POOL_SIZE, DB_READ_POOL_SIZE
+    return {
+        "pool_size": int(os.getenv(f"{prefix}_POOL_SIZE", "5")),          # Connections kept open
+        "max_overflow": int(os.getenv(f"{prefix}_MAX_OVERFLOW", "10")),   # Temporary extra connections
+        "pool_timeout": int(os.getenv(f"{prefix}_POOL_TIMEOUT", "30")),   # Seconds to wait for one
+        "pool_recycle": int(os.getenv(f"{prefix}_POOL_RECYCLE", "1800")), # Refresh after 30 mins
+    }
 
 engine = create_engine(
-    DATABASE_URL, 
-    pool_size=5,         # Keep only 5 connections open
-    max_overflow=10,     # Allow 10 temporary extra connections
-    pool_timeout=30,     # Wait 30s before giving up
-    pool_recycle=1800    # Refresh connections every 30 mins
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_logging_name="primary",
+    **pool_options("DB")
 )
+instrument_engine(engine, "primary")
+slow_queries.install(engine, "primary")
+
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        poolclass=TimedQueuePool,
+        pool_logging_name="read",
+        **pool_options("DB_READ")
+    )
+    instrument_engine(read_engine, "read")
+    slow_queries.install(read_engine, "read")
+else:
+    read_engine = engine
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -29,11 +61,102 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine.execution_options(postgresql_readonly=True)
+)
+
+# Async engine for code running on the event loop (auth, async routes),
+# so database waits don't block other requests on the worker.
+def make_async_url(url: str):
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+
+    # asyncpg takes "ssl" rather than libpq's "sslmode"
+    sslmode = async_url.query.get("sslmode")
+    if sslmode:
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+
+    return async_url
+
+async_engine = create_async_engine(
+    make_async_url(DATABASE_URL),
+    poolclass=TimedAsyncQueuePool,
+    pool_logging_name="async",
+    **pool_options("DB_ASYNC")
+)
+instrument_engine(async_engine, "async")
+slow_queries.install(async_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+class LazySession:
+    """
+    Stands in for a Session and only opens one on first use, so requests
+    answered from a cache or rejected before querying never touch the pool.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    def close(self):
+        session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+def _lazy_session(request: Request, factory):
+    db = LazySession(factory)
+
+    if not hasattr(request.state, "db_sessions"):
+        request.state.db_sessions = []
+    request.state.db_sessions.append(db)
+
     try:
         yield db
     finally:
         db.close()
+
+
+# Pick the session by intent: get_db for anything that writes,
+# get_read_db for list/report/reference reads that can tolerate replica lag.
+def get_db(request: Request):
+    yield from _lazy_session(request, SessionLocal)
+
+def get_read_db(request: Request):
+    yield from _lazy_session(request, ReadSessionLocal)
+
+
+class ReleaseSessionRoute(APIRoute):
+    """
+    Closes the request's sessions as soon as the handler has built its
+    response, instead of after a streamed body has been fully sent.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def release_sessions_handler(request: Request):
+            try:
+                return await handler(request)
+            finally:
+                for db in getattr(request.state, "db_sessions", ()):
+                    await run_in_threadpool(db.close)
+
+        return release_sessions_handler
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt is deliberately slow and CPU bound. Running it on a small,
+# bounded pool caps the CPU a burst of logins can take and keeps the
+# event loop free; requests beyond the queue limit are refused instead of
+# piling up.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "16"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+
+
+class HashingStats:
+    """Running counters for the bcrypt pool (queue wait and hash time)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, run_seconds: float):
+        with self._lock:
+            self.completed += 1
+            self.wait_seconds_total += wait_seconds
+            self.run_seconds_total += run_seconds
+            self.run_seconds_max = max(self.run_seconds_max, run_seconds)
+
+    def snapshot(self):
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": HASH_WORKERS,
+                "queue_limit": HASH_QUEUE_LIMIT,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds_total / completed * 1000, 2),
+                "avg_run_ms": round(self.run_seconds_total / completed * 1000, 2),
+                "max_run_ms": round(self.run_seconds_max * 1000, 2),
+            }
+
+
+stats = HashingStats()
+
+
+async def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        with stats._lock:
+            stats.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in requests. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+
+    queued_at = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            stats.record(started - queued_at, time.perf_counter() - started)
+
+    with stats._lock:
+        stats.in_flight += 1
+    try:
+        return await asyncio.wrap_future(_executor.submit(job))
+    finally:
+        with stats._lock:
+            stats.in_flight -= 1
+        _slots.release()
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(pwd_context.verify, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Failed logins are counted in memory; only an actual lockout is written
+# to the users row.
+LOGIN_FAILURE_LIMIT = int(os.getenv("LOGIN_FAILURE_LIMIT", "5"))
+LOGIN_FAILURE_WINDOW_SECONDS = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "300"))
+LOGIN_LOCKOUT_MINUTES = int(os.getenv("LOGIN_LOCKOUT_MINUTES", "1"))
+
+
+class LoginAttemptTracker:
+    """
+    Sliding-window failure counter per username. The number of tracked
+    usernames is capped (least recently failed evicted first) so a spray
+    across many names can't grow memory without bound.
+    """
+
+    def __init__(
+        self,
+        limit: int = LOGIN_FAILURE_LIMIT,
+        window_seconds: int = LOGIN_FAILURE_WINDOW_SECONDS,
+        lockout_seconds: int = LOGIN_LOCKOUT_MINUTES * 60,
+        max_tracked: int = 10000
+    ):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_tracked = max_tracked
+        self._failures = OrderedDict()
+        self._locked_until = {}
+        self._lock = threading.Lock()
+
+    def is_locked(self, username: str) -> bool:
+        key = username.lower()
+        with self._lock:
+            until = self._locked_until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._locked_until[key]
+                return False
+            return True
+
+    def record_failure(self, username: str) -> bool:
+        """Counts a failure; returns True when it triggers a lockout."""
+        key = username.lower()
+        now = time.monotonic()
+
+        with self._lock:
+            failures = self._failures.pop(key, None) or deque()
+            failures.append(now)
+            while failures and failures[0] <= now - self.window_seconds:
+                failures.popleft()
+
+            if len(failures) >= self.limit:
+                self._locked_until[key] = now + self.lockout_seconds
+                return True
+
+            self._failures[key] = failures
+            while len(self._failures) > self.max_tracked:
+                self._failures.popitem(last=False)
+
+            return False
+
+    def reset(self, username: str):
+        key = username.lower()
+        with self._lock:
+            self._failures.pop(key, None)
+            self._locked_until.pop(key, None)
+
+
+login_tracker = LoginAttemptTracker()
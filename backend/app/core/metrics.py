@@ -0,0 +1,257 @@
+import contextvars
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Per-request SQL counts and latency, per-route timings and connection pool
+# usage, exposed at /metrics in Prometheus text format. With several
+# uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so counters are summed
+# across processes (callback gauges then only report the serving worker).
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route, until the response is fully sent",
+    ["method", "route", "status"],
+)
+
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements issued per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000),
+)
+
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["method", "route"],
+)
+
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["engine"],
+)
+
+QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "SQL statements that raised",
+    ["engine"],
+)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["engine"],
+)
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+
+POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "pool_size + max_overflow",
+    ["engine"],
+    multiprocess_mode="max",
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self):
+        if self.scope is None:
+            return None
+        return getattr(self.scope.get("route"), "path", self.scope.get("path"))
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+# --------------------------------------------------
+# CONNECTION POOL
+# --------------------------------------------------
+
+class _TimedCheckoutMixin:
+    """Times how long a checkout waits for a free connection."""
+
+    def _do_get(self):
+        name = self.logging_name or "default"
+        started = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        except Exception:
+            if time.perf_counter() - started >= self._timeout:
+                POOL_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(name).observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# --------------------------------------------------
+# ENGINE EVENTS
+# --------------------------------------------------
+
+def instrument_engine(engine, name: str):
+    """Records every statement's time on the metrics and the current request."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _finish(conn, name)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        QUERY_ERRORS.labels(name).inc()
+        if context.connection is not None:
+            _finish(context.connection, name)
+
+    pool = sync_engine.pool
+    POOL_CAPACITY.labels(name).set(pool.size() + max(pool._max_overflow, 0))
+
+    if not PROMETHEUS_MULTIPROC_DIR:
+        POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+    else:
+        @event.listens_for(pool, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            POOL_CHECKED_OUT.labels(name).inc()
+
+        @event.listens_for(pool, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            POOL_CHECKED_OUT.labels(name).dec()
+
+
+def _finish(conn, name: str):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+
+    elapsed = time.perf_counter() - started.pop()
+    QUERY_SECONDS.labels(name).observe(elapsed)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+# --------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware: one RequestStats per request, shared through a
+    context variable with the engine events (including handlers running
+    in the threadpool). Routes are labelled by their path template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+
+
+# --------------------------------------------------
+# SNAPSHOT COLLECTORS / EXPOSITION
+# --------------------------------------------------
+
+class SnapshotCollector:
+    """Exposes the numeric values of an existing stats snapshot as gauges."""
+
+    def __init__(self, prefix: str, snapshot):
+        self.prefix = prefix
+        self.snapshot = snapshot
+
+    def collect(self):
+        for key, value in self.snapshot().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key}", value=value)
+
+
+def register_snapshot(prefix: str, snapshot):
+    REGISTRY.register(SnapshotCollector(prefix, snapshot))
+
+
+def render_latest():
+    """Returns (body, content type) for the /metrics endpoint."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
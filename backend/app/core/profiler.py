@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from starlette.concurrency import run_in_threadpool
+
+# Sampling profiler for live requests. A request is profiled when an
+# admin sends "X-Profile: 1", or when an admin has armed the next N
+# requests to a path. Stacks are written in folded format
+# ("frame;frame;frame count"), which flamegraph.pl and speedscope read.
+#
+# Every thread running application or framework code is sampled, so
+# requests served at the same moment can show up in the same profile.
+# Arming is per worker process.
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "sanfelipe_profiles")
+)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_HEADER = b"x-profile"
+
+# A thread is sampled only if one of its frames comes from these modules;
+# idle loop/pool threads are skipped.
+SAMPLED_MODULES = ("app.", "services.", "fastapi.", "starlette.", "pydantic", "pandas.", "xlsxwriter.")
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}-[\w.-]+$")
+
+
+class SamplingProfiler:
+    """Background thread that snapshots other threads' stacks at an interval."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        me = threading.get_ident()
+
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            self.samples += 1
+
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+
+                stack = []
+                relevant = False
+                while frame is not None:
+                    module = frame.f_globals.get("__name__", "?")
+                    relevant = relevant or module.startswith(SAMPLED_MODULES)
+                    stack.append(f"{module}.{frame.f_code.co_name}")
+                    frame = frame.f_back
+
+                if relevant:
+                    stack.append(names.get(ident, str(ident)))
+                    self.stacks[";".join(reversed(stack))] += 1
+
+
+class ProfilerState:
+    """Armed paths and the one-profile-at-a-time guard."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._armed = {}
+        self.busy = threading.Lock()
+
+    def arm(self, path: str, count: int):
+        with self._lock:
+            if count > 0:
+                self._armed[path] = count
+            else:
+                self._armed.pop(path, None)
+
+    def armed(self):
+        with self._lock:
+            return dict(self._armed)
+
+    def take(self, path: str):
+        with self._lock:
+            remaining = self._armed.get(path, 0)
+            if not remaining:
+                return False
+
+            if remaining == 1:
+                del self._armed[path]
+            else:
+                self._armed[path] = remaining - 1
+            return True
+
+
+state = ProfilerState()
+
+
+# --------------------------------------------------
+# STORAGE
+# --------------------------------------------------
+
+def _profile_id(method: str, path: str):
+    slug = re.sub(r"[^\w.-]+", "_", path.strip("/")) or "root"
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}-{os.urandom(4).hex()}-{method}_{slug}"[:120]
+
+
+def save_profile(profile_id: str, stacks: Counter):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    for old in list_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(profile_path(old["id"]))
+        except OSError:
+            pass
+
+
+def profile_path(profile_id: str):
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+
+
+def list_profiles():
+    """Newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".folded"):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            profiles.append({
+                "id": name[:-len(".folded")],
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(timespec="seconds"),
+            })
+
+    return sorted(profiles, key=lambda p: p["id"], reverse=True)
+
+
+# --------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------
+
+class ProfilerMiddleware:
+    """
+    Plain ASGI middleware. `authorize(scope)` decides whether a request
+    carrying the X-Profile header may be profiled (admins only); armed
+    paths need no header. The response gets an X-Profile-Id header.
+    """
+
+    def __init__(self, app, authorize):
+        self.app = app
+        self.authorize = authorize
+
+    def _wanted(self, scope):
+        headers = dict(scope.get("headers") or [])
+        if headers.get(PROFILE_HEADER) and self.authorize(scope):
+            return True
+        return state.take(scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Busy first: while another profile runs, an armed count is left
+        # for a later request instead of being used up unprofiled
+        if not state.busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._wanted(scope):
+            state.busy.release()
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = _profile_id(scope["method"], scope["path"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = SamplingProfiler().start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            stacks = profiler.stop()
+            state.busy.release()
+            await run_in_threadpool(save_profile, profile_id, stacks)
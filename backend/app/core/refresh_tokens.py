@@ -0,0 +1,132 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+# Refresh tokens are opaque "<token id>.<secret>" strings. Only an HMAC of
+# the secret is stored, looked up by token id, so a refresh costs one
+# primary-key read and a hash compare instead of a bcrypt verify.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Two tabs refreshing with the same token moments apart is not theft:
+# within this window a rotated token returns the same successor again.
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "30"))
+
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _digest(secret: str):
+    return hmac.new(SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def _successor_secret(secret: str):
+    # Derived rather than random so the successor can be handed out again
+    # during the grace window without storing any secret in clear.
+    return hmac.new(SECRET_KEY.encode(), f"successor:{secret}".encode(), hashlib.sha256).hexdigest()
+
+
+def _split(raw_token: str):
+    token_id, _, secret = (raw_token or "").partition(".")
+    if not token_id or not secret:
+        raise InvalidRefreshToken()
+    return token_id, secret
+
+
+def issue_refresh_token(db: AsyncSession, user_id: int, secret: str = None):
+    """Adds a new refresh token to the session; the caller commits."""
+    token_id = secrets.token_hex(16)
+    secret = secret or secrets.token_urlsafe(32)
+
+    db.add(models.RefreshToken(
+        id=token_id,
+        user_id=user_id,
+        token_hash=_digest(secret),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+
+    return f"{token_id}.{secret}"
+
+
+async def _load(db: AsyncSession, raw_token: str):
+    """
+    The token row, locked FOR UPDATE until the caller commits, so
+    concurrent refreshes with one token run one after the other.
+    """
+    token_id, secret = _split(raw_token)
+
+    token = await db.get(models.RefreshToken, token_id, with_for_update=True)
+    if token is None or not hmac.compare_digest(token.token_hash, _digest(secret)):
+        raise InvalidRefreshToken()
+
+    return token, secret
+
+
+async def rotate_refresh_token(db: AsyncSession, raw_token: str):
+    """
+    Exchanges a valid refresh token for a new one and returns
+    (user_id, new_raw_token). A token rotated less than
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS ago returns the same successor
+    (while that one is still valid). Any other reuse of a rotated or
+    revoked token is treated as theft: every refresh token of that user
+    is revoked.
+    """
+    token, secret = await _load(db, raw_token)
+    now = datetime.utcnow()
+
+    if token.revoked_at is not None:
+        successor = await _grace_successor(db, token, now)
+        if successor is not None:
+            return token.user_id, f"{successor.id}.{_successor_secret(secret)}"
+
+        await revoke_user_refresh_tokens(db, token.user_id)
+        await db.commit()
+        raise InvalidRefreshToken()
+
+    if token.expires_at <= now:
+        raise InvalidRefreshToken()
+
+    new_raw_token = issue_refresh_token(db, token.user_id, secret=_successor_secret(secret))
+
+    token.revoked_at = now
+    token.replaced_by = new_raw_token.partition(".")[0]
+
+    return token.user_id, new_raw_token
+
+
+async def _grace_successor(db: AsyncSession, token, now: datetime):
+    if not token.replaced_by:
+        return None     # Revoked by sign-out or a password reset, not rotated
+
+    if now - token.revoked_at > timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+        return None
+
+    successor = await db.get(models.RefreshToken, token.replaced_by)
+    if successor is None or successor.revoked_at is not None or successor.expires_at <= now:
+        return None
+
+    return successor
+
+
+async def revoke_refresh_token(db: AsyncSession, raw_token: str):
+    token, _ = await _load(db, raw_token)
+    if token.revoked_at is None:
+        token.revoked_at = datetime.utcnow()
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int):
+    await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.revoked_at.is_(None)
+        )
+        .values(revoked_at=datetime.utcnow())
+    )
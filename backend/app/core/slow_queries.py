@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from app.core.barangay_scope import BARANGAY_MAPPING
+from app.core.cache import TTLCache
+from app.core.metrics import current_request_stats
+
+# Statements slower than SLOW_QUERY_MS are written, with their plan, to a
+# rotating JSON-lines log and kept in a small in-memory buffer for the
+# admin endpoint. Fast statements only pay for two perf_counter() calls.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG = os.getenv(
+    "SLOW_QUERY_LOG",
+    os.path.join(tempfile.gettempdir(), "sanfelipe_slow_queries.log")
+)
+SLOW_QUERY_LOG_BYTES = int(os.getenv("SLOW_QUERY_LOG_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "3"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+# One EXPLAIN per statement shape per interval, however often it is slow
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+
+# Frames from these packages are reported as the calling code
+CALLER_PREFIXES = ("app.crud", "services.", "app.main")
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+_RESIDENT_CODE = re.compile(r"^SF-\d+$")
+_SAFE_STRINGS = {label for label in BARANGAY_MAPPING.values()} | {"", "%", "ASC", "DESC"}
+
+logger = logging.getLogger("sanfelipe.slow_queries")
+logger.propagate = False
+
+recent = deque(maxlen=SLOW_QUERY_BUFFER)
+_recent_lock = threading.Lock()
+_explained = TTLCache(maxsize=512, ttl=SLOW_QUERY_EXPLAIN_INTERVAL)
+_handler_lock = threading.Lock()
+
+
+# --------------------------------------------------
+# REDACTION
+# --------------------------------------------------
+
+def redact_value(value):
+    """
+    Keeps what helps reproduce a filter (barangay labels, resident
+    codes, numbers, LIKE wildcards) and replaces anything that may be a
+    name or birthdate.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    if isinstance(value, (date, datetime)):
+        return "<date>"
+
+    if isinstance(value, str):
+        core = value.strip("%")
+        if core.upper() in _SAFE_STRINGS or _RESIDENT_CODE.match(core):
+            return value
+
+        prefix = "%" if value.startswith("%") else ""
+        suffix = "%" if value.endswith("%") and len(value) > 1 else ""
+        return f"{prefix}<redacted:{len(core)}>{suffix}"
+
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: redact_value(value) for key, value in parameters.items()}
+
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(p) if isinstance(p, (dict, list, tuple)) else redact_value(p)
+                for p in parameters]
+
+    return redact_value(parameters)
+
+
+# --------------------------------------------------
+# CAPTURE
+# --------------------------------------------------
+
+def _caller():
+    """Innermost application frame (crud/service/route) that issued the query."""
+    frame = sys._getframe(2)
+
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(CALLER_PREFIXES):
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+
+    return None
+
+
+def _explain(conn, statement, parameters):
+    """EXPLAIN (not ANALYZE) on the same psycopg2 connection; None elsewhere."""
+    if not SLOW_QUERY_EXPLAIN or not _EXPLAINABLE.match(statement):
+        return None
+
+    if conn.dialect.driver != "psycopg2" or _explained.get(statement):
+        return None
+
+    _explained.set(statement, True)
+
+    # A failed EXPLAIN must not abort the caller's transaction
+    in_transaction = not getattr(conn.connection.dbapi_connection, "autocommit", False)
+
+    cursor = conn.connection.cursor()
+    try:
+        if in_transaction:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f"EXPLAIN failed: {e}"
+        if in_transaction:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _ensure_handler():
+    if logger.handlers:
+        return
+
+    with _handler_lock:
+        if logger.handlers:
+            return
+
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG,
+            maxBytes=SLOW_QUERY_LOG_BYTES,
+            backupCount=SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def _record(conn, engine_name, statement, parameters, executemany, elapsed):
+    stats = current_request_stats()
+
+    entry = {
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "engine": engine_name,
+        "duration_ms": round(elapsed * 1000, 1),
+        "route": stats.route if stats else None,
+        "method": stats.scope.get("method") if stats and stats.scope else None,
+        "caller": _caller(),
+        "statement": statement,
+        "parameters": redact_parameters(parameters),
+        "plan": None if executemany else _explain(conn, statement, parameters),
+    }
+
+    with _recent_lock:
+        recent.append(entry)
+
+    _ensure_handler()
+    logger.info(json.dumps(entry, default=str, ensure_ascii=False))
+
+
+def install(engine, name: str):
+    """Adds the slow-query recorder to an engine (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    threshold = SLOW_QUERY_MS / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+
+        elapsed = time.perf_counter() - started.pop()
+        if elapsed < threshold:
+            return
+
+        try:
+            _record(conn, name, statement, parameters, executemany, elapsed)
+        except Exception:
+            logging.getLogger(__name__).exception("Could not record slow query")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            started = context.connection.info.get("slow_query_started")
+            if started:
+                started.pop()
+
+
+def recent_slow_queries(limit: int = 50):
+    with _recent_lock:
+        entries = list(recent)
+    return entries[::-1][:limit]
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Startup warm-up: a new worker opens its pool connections and fills the
+# in-process caches before /ready reports it as ready, so the load
+# balancer only sends it traffic once the first requests are warm.
+# Failed steps are retried; after WARMUP_MAX_SECONDS the worker reports
+# ready anyway, since serving cold beats never serving.
+# railway.json points the deploy health check at /ready, with a timeout
+# above WARMUP_MAX_SECONDS so a deploy only takes traffic once warm.
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "0"))   # 0 = each pool's pool_size
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+WARMUP_MAX_SECONDS = float(os.getenv("WARMUP_MAX_SECONDS", "60"))
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.started_at = None
+        self.finished_at = None
+        self.steps = {}
+        self.errors = {}
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "warmup_seconds": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at and self.started_at else None
+            ),
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+        }
+
+
+readiness = Readiness()
+
+
+# --------------------------------------------------
+# POOLS
+# --------------------------------------------------
+
+def _connection_count(engine):
+    return WARMUP_CONNECTIONS or getattr(engine.pool, "size", lambda: 1)()
+
+
+def open_pool(engine):
+    """Checks out the pool's connections at once, then returns them idle."""
+    connections = []
+    try:
+        for _ in range(_connection_count(engine)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def open_async_pool(engine):
+    async def ping():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # Concurrent checkouts, so the pool really grows to that size
+    await asyncio.gather(*(ping() for _ in range(_connection_count(engine.sync_engine))))
+
+
+# --------------------------------------------------
+# RUNNER
+# --------------------------------------------------
+
+async def _run_step(name, step):
+    started = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(step):
+        await step()
+    else:
+        await run_in_threadpool(step)
+
+    readiness.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def warm_up(steps):
+    """
+    Runs `steps` ((name, callable) pairs, sync or async) and marks the
+    worker ready once all of them have succeeded or WARMUP_MAX_SECONDS
+    have passed.
+    """
+    readiness.started_at = time.monotonic()
+    deadline = readiness.started_at + WARMUP_MAX_SECONDS
+    remaining = list(steps)
+
+    while remaining:
+        failed = []
+        for name, step in remaining:
+            try:
+                await _run_step(name, step)
+                readiness.errors.pop(name, None)
+            except Exception as exc:
+                logger.warning("Warm-up step %s failed: %s", name, exc)
+                readiness.errors[name] = str(exc)[:200]
+                failed.append((name, step))
+
+        remaining = failed
+        if remaining:
+            if time.monotonic() >= deadline:
+                logger.error("Warm-up gave up on %s; serving cold", ", ".join(n for n, _ in remaining))
+                break
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+    readiness.finished_at = time.monotonic()
+    readiness.ready = True
+    logger.info("Worker warm in %.2fs", readiness.finished_at - readiness.started_at)
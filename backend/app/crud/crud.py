@@ -3,6 +3,8 @@ from sqlalchemy import or_, func
 from app import models, schemas
 from datetime import datetime
 from app.core.audit import log_action
+from app.core.barangay_scope import resident_barangay_label
+from app.core.data_version import bump_data_version
 from sqlalchemy.exc import IntegrityError
 import re
 
@@ -44,9 +46,11 @@ def apply_search_filter(query, search: str):
 # FILTER HELPERS
 # =====================================================
 def apply_barangay_filter(query, barangay: str):
+    # Exact match on upper(barangay) so the filter can use an index;
+    # callers pass the resident barangay label (see core.barangay_scope).
     if barangay:
         query = query.filter(
-            func.lower(models.ResidentProfile.barangay).like(f"%{barangay.lower()}%")
+            func.upper(models.ResidentProfile.barangay) == barangay.upper()
         )
     return query
 
@@ -70,6 +74,32 @@ def apply_sector_filter(query, sector: str):
     )
 
 
+# =====================================================
+# DUPLICATE CHECK
+# =====================================================
+def find_duplicate_resident(
+    db: Session,
+    first_name: str,
+    middle_name: str,
+    last_name: str,
+    birthdate,
+    exclude_id: int = None
+):
+    # Same expressions as ix_resident_profiles_active_identity
+    query = db.query(models.ResidentProfile).filter(
+        func.upper(func.coalesce(models.ResidentProfile.last_name, "")) == last_name,
+        func.upper(func.coalesce(models.ResidentProfile.first_name, "")) == first_name,
+        func.upper(func.coalesce(models.ResidentProfile.middle_name, "")) == middle_name,
+        models.ResidentProfile.birthdate == birthdate,
+        models.ResidentProfile.is_deleted == False
+    )
+
+    if exclude_id is not None:
+        query = query.filter(models.ResidentProfile.id != exclude_id)
+
+    return query.first()
+
+
 # =====================================================
 # CREATE RESIDENT
 # =====================================================
@@ -87,16 +117,19 @@ def create_resident(db: Session, resident: schemas.ResidentCreate):
     for field in ["first_name", "middle_name", "last_name"]:
         filtered_data[field] = filtered_data[field].strip().upper() if filtered_data.get(field) else ""
 
+    # Stored as the label apply_barangay_filter matches exactly
+    filtered_data["barangay"] = resident_barangay_label(filtered_data.get("barangay"))
+
     if not filtered_data.get("birthdate"):
         raise ValueError("Birthdate is required.")
 
-    existing = db.query(models.ResidentProfile).filter(
-        func.upper(func.coalesce(models.ResidentProfile.first_name, "")) == filtered_data["first_name"],
-        func.upper(func.coalesce(models.ResidentProfile.middle_name, "")) == filtered_data["middle_name"],
-        func.upper(func.coalesce(models.ResidentProfile.last_name, "")) == filtered_data["last_name"],
-        models.ResidentProfile.birthdate == filtered_data["birthdate"],
-        models.ResidentProfile.is_deleted == False
-    ).first()
+    existing = find_duplicate_resident(
+        db,
+        filtered_data["first_name"],
+        filtered_data["middle_name"],
+        filtered_data["last_name"],
+        filtered_data["birthdate"]
+    )
 
     if existing:
         raise ValueError("Resident already registered.")
@@ -121,6 +154,7 @@ def create_resident(db: Session, resident: schemas.ResidentCreate):
             filtered_member = {k: v for k, v in member_data.items() if k in valid_fm_columns}
             db.add(models.FamilyMember(**filtered_member, profile_id=db_resident.id))
 
+        bump_data_version(db, db_resident.barangay)
         db.commit()
         db.refresh(db_resident)
         return db_resident
@@ -141,6 +175,8 @@ def update_resident(db: Session, resident_id: int, resident_data: schemas.Reside
     if not db_resident:
         return None
 
+    previous_barangay = db_resident.barangay
+
     update_data = resident_data.model_dump(exclude={"sector_ids", "family_members", "resident_code"})
     for key, value in update_data.items():
         setattr(db_resident, key, value)
@@ -149,17 +185,19 @@ def update_resident(db: Session, resident_id: int, resident_data: schemas.Reside
         value = getattr(db_resident, field)
         setattr(db_resident, field, value.strip().upper() if value else "")
 
+    db_resident.barangay = resident_barangay_label(db_resident.barangay)
+
     if not db_resident.birthdate:
         raise ValueError("Birthdate is required.")
 
-    existing = db.query(models.ResidentProfile).filter(
-        models.ResidentProfile.id != resident_id,
-        func.upper(func.coalesce(models.ResidentProfile.first_name, "")) == db_resident.first_name,
-        func.upper(func.coalesce(models.ResidentProfile.middle_name, "")) == db_resident.middle_name,
-        func.upper(func.coalesce(models.ResidentProfile.last_name, "")) == db_resident.last_name,
-        models.ResidentProfile.birthdate == db_resident.birthdate,
-        models.ResidentProfile.is_deleted == False
-    ).first()
+    existing = find_duplicate_resident(
+        db,
+        db_resident.first_name,
+        db_resident.middle_name,
+        db_resident.last_name,
+        db_resident.birthdate,
+        exclude_id=resident_id
+    )
 
     if existing:
         db.rollback()
@@ -181,6 +219,7 @@ def update_resident(db: Session, resident_id: int, resident_data: schemas.Reside
         for fm_data in resident_data.family_members:
             db.add(models.FamilyMember(**fm_data.model_dump(), profile_id=resident_id))
 
+    bump_data_version(db, previous_barangay, db_resident.barangay)
     db.commit()
     db.refresh(db_resident)
     return db_resident
@@ -220,6 +259,7 @@ def promote_family_member_to_head(db: Session, resident_id: int, new_head_member
 
     db.add(new_head)
     db.delete(member)
+    bump_data_version(db, current_head.barangay)
     db.commit()
     db.refresh(new_head)
     return new_head
@@ -238,6 +278,7 @@ def soft_delete_resident(db: Session, resident_id: int):
 
     resident.is_deleted = True
     resident.deleted_at = datetime.utcnow()
+    bump_data_version(db, resident.barangay)
     db.commit()
     db.refresh(resident)
     return resident
@@ -256,6 +297,7 @@ def restore_resident(db: Session, resident_id: int):
 
     resident.is_deleted = False
     resident.deleted_at = None
+    bump_data_version(db, resident.barangay)
     db.commit()
     db.refresh(resident)
     return resident
@@ -276,6 +318,7 @@ def archive_resident(db: Session, resident_id: int, user_id: int):
     resident.is_archived = True
 
     log_action(db, user_id, "Archived resident", "resident", resident_id)
+    bump_data_version(db, resident.barangay)
 
     db.commit()
     db.refresh(resident)
@@ -293,6 +336,7 @@ def permanently_delete_resident(db: Session, resident_id: int):
     if not resident:
         return None
 
+    bump_data_version(db, resident.barangay)
     db.delete(resident)
     db.commit()
     return True
@@ -377,14 +421,15 @@ def get_residents(
 # =====================================================
 # DASHBOARD STATS
 # =====================================================
-def get_dashboard_stats(db: Session):
+def get_dashboard_stats(db: Session, barangay: str = None):
     base_query = db.query(models.ResidentProfile).filter(
         models.ResidentProfile.is_deleted == False
     )
+    base_query = apply_barangay_filter(base_query, barangay)
 
     total_residents = base_query.count() or 0
 
-    total_households = db.query(
+    total_households = apply_barangay_filter(db.query(
         func.count(
             func.distinct(
                 func.trim(models.ResidentProfile.barangay) +
@@ -392,7 +437,7 @@ def get_dashboard_stats(db: Session):
                 func.coalesce(func.trim(models.ResidentProfile.house_no), "")
             )
         )
-    ).filter(models.ResidentProfile.is_deleted == False).scalar() or 0
+    ).filter(models.ResidentProfile.is_deleted == False), barangay).scalar() or 0
 
     total_male = base_query.filter(
         func.lower(models.ResidentProfile.sex).in_(["male", "m"])
@@ -402,23 +447,23 @@ def get_dashboard_stats(db: Session):
         func.lower(models.ResidentProfile.sex).in_(["female", "f"])
     ).count() or 0
 
-    barangay_counts = db.query(
+    barangay_counts = apply_barangay_filter(db.query(
         func.upper(func.trim(models.ResidentProfile.barangay)).label("barangay"),
         func.count(models.ResidentProfile.id)
     ).filter(
         models.ResidentProfile.is_deleted == False
-    ).group_by(
+    ), barangay).group_by(
         func.upper(func.trim(models.ResidentProfile.barangay))
     ).all()
 
     stats_barangay = {b: count for b, count in barangay_counts if b}
 
-    sector_counts = db.query(
+    sector_counts = apply_barangay_filter(db.query(
         models.ResidentProfile.sector_summary,
         func.count(models.ResidentProfile.id)
     ).filter(
         models.ResidentProfile.is_deleted == False
-    ).group_by(
+    ), barangay).group_by(
         models.ResidentProfile.sector_summary
     ).all()
 
@@ -1,38 +1,71 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Depends, HTTPException, status, Query, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Union
+from typing import List, Union, NamedTuple, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy import text, func
-from services.import_service import process_excel_import
+from sqlalchemy import text, func, select, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import io
-import qrcode
-from io import BytesIO
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
 
 # Authentication
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 import os
+import hashlib
+import hmac
 from dotenv import load_dotenv
 from jose.exceptions import ExpiredSignatureError
 
 from app import models, schemas, crud
-from app.core.database import engine, get_db
-from services import report_service
+from app.core.database import (
+    get_db, get_read_db, get_async_db, ReleaseSessionRoute,
+    ReadSessionLocal, engine, read_engine, async_engine,
+)
+from app.core.data_version import bump_data_version, get_data_version, version_key
+from app.core.cache import TTLCache
+from app.core.hashing import verify_password, hash_password
+from app.core.hashing import stats as hashing_stats
+from app.core import metrics, slow_queries, profiler, warmup
+from app.core.login_guard import login_tracker, LOGIN_LOCKOUT_MINUTES
+from app.core.refresh_tokens import (
+    InvalidRefreshToken,
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens,
+)
+from app.core.barangay_scope import (
+    match_barangay,
+    resident_barangay_label,
+    fallback_barangay_label,
+)
+from services import export_service, export_cache, qr_service, id_card_service, verification_service
 
-import cloudinary.uploader
-from app.core.cloudinary_config import *
+from app.core.cloudinary_config import get_uploader
 
 # ---------------------------------------------------
 # INITIALIZE APP
 # ---------------------------------------------------
 
-models.Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python -m migrations upgrade`
+# (release step), not on startup. Startup only warms this worker up in
+# the background; /ready turns 200 once that is done.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(warmup.warm_up(warmup_steps()))
+    yield
+    task.cancel()
 
-app = FastAPI(title="San Felipe Residential Profile Form")
+app = FastAPI(title="San Felipe Residential Profile Form", lifespan=lifespan)
+app.router.route_class = ReleaseSessionRoute
 
 # ---------------------------------------------------
 # CORS
@@ -51,9 +84,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"]
+    expose_headers=["Content-Disposition", "ETag", "Last-Modified", "X-Profile-Id"]
 )
 
+# ---------------------------------------------------
+# METRICS
+# ---------------------------------------------------
+
+def token_is_admin(scope):
+    # Runs before routing, so only the signed token's claims are checked
+    authorization = dict(scope.get("headers") or []).get(b"authorization", b"").decode()
+    if not authorization.startswith("Bearer "):
+        return False
+
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+
+    return payload.get("type") == "access" and payload.get("role") == "admin"
+
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.register_snapshot("bcrypt_pool", hashing_stats.snapshot)
+
+# Scraped by Prometheus rather than a logged-in user: set METRICS_TOKEN
+# and send "Authorization: Bearer <token>". Without it only an admin
+# access token is accepted, so the endpoint is never open by default.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+def metrics_authorized(request: Request):
+    if not METRICS_TOKEN:
+        return token_is_admin(request.scope)
+
+    authorization = request.headers.get("authorization", "")
+    return hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    if not metrics_authorized(request):
+        raise HTTPException(status_code=401)
+
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+# ---------------------------------------------------
+# PROFILING
+# ---------------------------------------------------
+
+app.add_middleware(profiler.ProfilerMiddleware, authorize=token_is_admin)
+
 load_dotenv()
 
 # ---------------------------------------------------
@@ -68,40 +147,56 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Resolved users are cached per worker so authenticated requests skip the
+# users lookup. Entries are checked against the token's version claim.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# ---------------------------------------------------
-# BARANGAY MAPPING
-# ---------------------------------------------------
-
-BARANGAY_MAPPING = {
-    "faranal": "FARAÑAL",
-    "santo_nino": "STO NIÑO",
-    "santonino": "STO NIÑO",
-    "sto_nino": "STO NIÑO",
-    "sto nino": "STO NIÑO",
-    "sto niño": "STO NIÑO",
-    "santo nino": "STO NIÑO",
-    "santo niño": "STO NIÑO",
-    "rosete": "ROSETE",
-    "amagna": "AMAGNA",
-    "apostol": "APOSTOL",
-    "balincaguing": "BALINCAGUING",
-    "maloma": "MALOMA",
-    "sindol": "SINDOL",
-    "sanrafael": "SAN RAFAEL",
-    "san rafael": "SAN RAFAEL",
-}
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
 
 # ---------------------------------------------------
 # AUTH HELPERS
 # ---------------------------------------------------
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+class Principal(NamedTuple):
+    """Detached snapshot of the authenticated user, safe to share across requests."""
+    id: int
+    username: str
+    role: str
+    token_version: str
+    barangay_id: Optional[int] = None
+    barangay: Optional[str] = None     # Resident barangay label for scoped accounts
+
+
+def get_token_version(user: models.User):
+    # Changes whenever the password or role changes, so tokens issued
+    # before a reset or role change stop resolving to a principal.
+    return hashlib.sha256(
+        f"{user.hashed_password}:{user.role}".encode()
+    ).hexdigest()[:16]
+
+def invalidate_principal(username: str):
+    principal_cache.pop(username)
+
+def build_token_response(user: models.User, refresh_token: str):
+    access_token = create_access_token(
+        data={
+            "sub": user.username,
+            "role": user.role,
+            "ver": get_token_version(user),
+            "brgy": user.barangay_id
+        }
+    )
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "role": user.role
+    }
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -120,7 +215,7 @@ def create_access_token(data: dict):
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=401,
@@ -138,32 +233,93 @@ async def get_current_user(
         if username is None:
             raise credentials_exception
 
+        token_version = payload.get("ver")
+
+        # Tokens issued before scope claims existed carry no "brgy"
+        has_scope_claim = "brgy" in payload
+        token_barangay_id = payload.get("brgy")
+
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(
-        models.User.username == username
-    ).first()
+    principal = principal_cache.get(username)
+
+    # A version or scope mismatch may just mean this worker's entry
+    # predates a password/role change or a scope resolved at login in
+    # another worker, so re-read before rejecting. The users row stays
+    # authoritative for the scope itself.
+    if principal is None or (
+        token_version is not None and token_version != principal.token_version
+    ) or (
+        has_scope_claim and token_barangay_id != principal.barangay_id
+    ):
+        result = await db.execute(
+            select(models.User, models.Barangay.name)
+            .outerjoin(models.Barangay, models.Barangay.id == models.User.barangay_id)
+            .where(models.User.username == username)
+        )
+        row = result.first()
+
+        if row is None:
+            raise credentials_exception
 
-    if user is None:
+        user, barangay_name = row
+
+        principal = Principal(
+            id=user.id,
+            username=user.username,
+            role=user.role,
+            token_version=get_token_version(user),
+            barangay_id=user.barangay_id,
+            barangay=(
+                resident_barangay_label(barangay_name) if barangay_name
+                else fallback_barangay_label(user.username)
+            )
+        )
+        principal_cache.set(username, principal)
+
+    # Tokens issued before version claims existed carry no "ver"
+    if token_version is not None and token_version != principal.token_version:
         raise credentials_exception
 
-    return user
+    return principal
+
+def get_barangay_scope(current_user: Principal = Depends(get_current_user)):
+    """
+    Barangay every resident query of this user is restricted to, as the
+    label stored on resident rows; None for admins (no restriction).
+    """
+    if current_user.role == "admin":
+        return None
+    return current_user.barangay
+
+async def resolve_user_barangay_id(db: AsyncSession, username: str):
+    result = await db.execute(select(models.Barangay))
+    barangay = match_barangay(result.scalars().all(), username)
+    return barangay.id if barangay else None
 
 # ---------------------------------------------------
 # LOGIN
 # ---------------------------------------------------
 
 @app.post("/token")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(
-        models.User.username == form_data.username
-    ).first()
+    # 🔒 Locked out in this worker: refuse before any DB or bcrypt work
+    if login_tracker.is_locked(form_data.username):
+        raise HTTPException(
+            status_code=403,
+            detail="Account locked. Try again later."
+        )
+
+    result = await db.execute(
+        select(models.User).where(models.User.username == form_data.username)
+    )
+    user = result.scalar_one_or_none()
 
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
@@ -176,33 +332,73 @@ def login(
         )
 
     # 🔐 Check password
-    if not verify_password(form_data.password, user.hashed_password):
-
-        user.failed_attempts += 1
+    if not await verify_password(form_data.password, user.hashed_password):
 
-        # Lock after 5 failed attempts
-        if user.failed_attempts >= 5:
-            user.locked_until = datetime.utcnow() + timedelta(minutes=1)
+        # Lock after too many failures in the window; only the lockout
+        # itself is written to the database.
+        if login_tracker.record_failure(user.username):
+            user.locked_until = datetime.utcnow() + timedelta(minutes=LOGIN_LOCKOUT_MINUTES)
             user.failed_attempts = 0
-
-        db.commit()
+            await db.commit()
 
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
     # ✅ Successful login
+    login_tracker.reset(user.username)
+
     user.failed_attempts = 0
     user.locked_until = None
-    db.commit()
 
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role}
-    )
+    # Accounts created before scopes were stored get theirs resolved once
+    resolved_scope = user.role != "admin" and user.barangay_id is None
+    if resolved_scope:
+        user.barangay_id = await resolve_user_barangay_id(db, user.username)
+
+    refresh_token = issue_refresh_token(db, user.id)
+    await db.commit()
+
+    if resolved_scope:
+        # The cached principal still holds the username-derived fallback
+        invalidate_principal(user.username)
+
+    return build_token_response(user, refresh_token)
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "role": user.role
-    }
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+@app.post("/token/refresh")
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    invalid = HTTPException(status_code=401, detail="Invalid refresh token")
+
+    try:
+        user_id, refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    except InvalidRefreshToken:
+        raise invalid
+
+    user = await db.get(models.User, user_id)
+    if user is None or user.is_archived:
+        raise invalid
+
+    await db.commit()
+
+    return build_token_response(user, refresh_token)
+
+@app.post("/token/revoke")
+async def revoke_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        await revoke_refresh_token(db, body.refresh_token)
+        await db.commit()
+    except InvalidRefreshToken:
+        pass
+
+    return {"message": "Signed out"}
 
 
 # ---------------------------------------------------
@@ -213,34 +409,95 @@ class UserCreate(BaseModel):
     username: str
     password: str
     role: str = "barangay"
+    barangay_id: Optional[int] = None
 
 @app.post("/users/")
-def create_user(user: UserCreate,
-                db: Session = Depends(get_db),
-                current_user: models.User = Depends(get_current_user)):
+async def create_user(user: UserCreate,
+                      db: AsyncSession = Depends(get_async_db),
+                      current_user: models.User = Depends(get_current_user)):
 
     if current_user.role != "admin":
         raise HTTPException(status_code=403)
 
-    existing = db.query(models.User).filter(
-        models.User.username == user.username
-    ).first()
+    result = await db.execute(
+        select(models.User).where(models.User.username == user.username)
+    )
 
-    if existing:
+    if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_pw = pwd_context.hash(user.password)
+    barangay_id = None
+    if user.role != "admin":
+        if user.barangay_id is not None:
+            if not await db.get(models.Barangay, user.barangay_id):
+                raise HTTPException(status_code=400, detail="Barangay not found")
+            barangay_id = user.barangay_id
+        else:
+            barangay_id = await resolve_user_barangay_id(db, user.username)
+
+    hashed_pw = await hash_password(user.password)
     new_user = models.User(
         username=user.username,
         hashed_password=hashed_pw,
-        role=user.role
+        role=user.role,
+        barangay_id=barangay_id
     )
 
     db.add(new_user)
-    db.commit()
+    await db.commit()
 
     return {"message": "User created successfully"}
 
+@app.get("/users/hashing-stats")
+def get_hashing_stats(current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    return hashing_stats.snapshot()
+
+@app.get("/admin/slow-queries")
+def get_slow_queries(limit: int = Query(50, ge=1, le=500),
+                     current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    return {
+        "threshold_ms": slow_queries.SLOW_QUERY_MS,
+        "items": slow_queries.recent_slow_queries(limit)
+    }
+
+@app.get("/admin/profiler")
+def get_profiler_status(current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    return {
+        "armed": profiler.state.armed(),
+        "profiles": profiler.list_profiles()
+    }
+
+@app.post("/admin/profiler/arm")
+def arm_profiler(path: str = Query(...),
+                 count: int = Query(1, ge=0, le=100),
+                 current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    profiler.state.arm(path, count)
+    return {"armed": profiler.state.armed()}
+
+@app.get("/admin/profiler/{profile_id}")
+def download_profile(profile_id: str,
+                     current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    path = profiler.profile_path(profile_id)
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
 @app.get("/users/")
 def get_users(db: Session = Depends(get_db),
               current_user: models.User = Depends(get_current_user)):
@@ -294,37 +551,47 @@ def delete_user(
                 detail="Cannot delete the last administrator"
             )
 
+    # Sessions end immediately: refresh tokens go with the account
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_to_delete.id
+    ).delete(synchronize_session=False)
+
     db.delete(user_to_delete)
     db.commit()
 
+    invalidate_principal(user_to_delete.username)
+
     return {"message": f"User '{user_to_delete.username}' deleted successfully"}
 
 class UserPasswordReset(BaseModel):
     new_password: str
     
 @app.put("/users/{user_id}/reset-password", status_code=200)
-def reset_password(
+async def reset_password(
     user_id: int,
     password_data: UserPasswordReset,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # Only admin can reset
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can reset passwords")
 
-    user_to_edit = db.query(models.User).filter(
-        models.User.id == user_id
-    ).first()
+    user_to_edit = await db.get(models.User, user_id)
 
     if not user_to_edit:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Hash new password
-    hashed_pw = pwd_context.hash(password_data.new_password)
+    hashed_pw = await hash_password(password_data.new_password)
     user_to_edit.hashed_password = hashed_pw
 
-    db.commit()
+    await revoke_user_refresh_tokens(db, user_to_edit.id)
+    await db.commit()
+
+    login_tracker.reset(user_to_edit.username)
+
+    invalidate_principal(user_to_edit.username)
 
     return {"message": f"Password reset for {user_to_edit.username}"}
 
@@ -336,16 +603,9 @@ def reset_password(
 @app.post("/residents/", response_model=schemas.Resident)
 def create_resident(resident: schemas.ResidentCreate,
                     db: Session = Depends(get_db),
-                    current_user: models.User = Depends(get_current_user)):
-    
-    if current_user.role != "admin":
-        username_lower = current_user.username.lower()
-        official_name = None
-        for key in BARANGAY_MAPPING:
-            if key in username_lower:
-                official_name = BARANGAY_MAPPING[key]
-                break
-        resident.barangay = official_name or current_user.username.replace("_", " ").title()
+                    scope: Optional[str] = Depends(get_barangay_scope)):
+
+    resident.barangay = scope or resident_barangay_label(resident.barangay)
 
     try:
         return crud.create_resident(db=db, resident=resident)
@@ -360,6 +620,7 @@ def update_resident(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    resident.barangay = resident_barangay_label(resident.barangay)
 
     db_resident = crud.update_resident(
         db,
@@ -422,17 +683,20 @@ def remove_assistance(
 async def upload_resident_photo(
     resident_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # 🔒 Only admin can upload photo
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
 
-    resident = db.query(models.ResidentProfile).filter(
-        models.ResidentProfile.id == resident_id,
-        models.ResidentProfile.is_deleted == False
-    ).first()
+    result = await db.execute(
+        select(models.ResidentProfile).where(
+            models.ResidentProfile.id == resident_id,
+            models.ResidentProfile.is_deleted == False
+        )
+    )
+    resident = result.scalar_one_or_none()
 
     if not resident:
         raise HTTPException(status_code=404, detail="Resident not found")
@@ -442,8 +706,9 @@ async def upload_resident_photo(
         raise HTTPException(status_code=400, detail="File must be an image")
 
     try:
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
+        # Upload to Cloudinary (blocking HTTP call, keep it off the event loop)
+        result = await run_in_threadpool(
+            get_uploader().upload,
             file.file,
             folder="san_felipe_residents",
             public_id=f"resident_{resident.id}",
@@ -452,7 +717,7 @@ async def upload_resident_photo(
 
         # Save URL to database
         resident.photo_url = result["secure_url"]
-        db.commit()
+        await db.commit()
 
         return {
             "message": "Photo uploaded successfully",
@@ -469,7 +734,7 @@ async def upload_resident_photo(
 # ------------------------------
 
 @app.get("/residents/archived")
-def get_archived_residents(db: Session = Depends(get_db),
+def get_archived_residents(db: Session = Depends(get_read_db),
                            current_user: models.User = Depends(get_current_user)):
 
     if current_user.role != "admin":
@@ -479,6 +744,46 @@ def get_archived_residents(db: Session = Depends(get_db),
         models.ResidentProfile.is_deleted == True
     ).all()
     
+# Declared before /residents/{resident_id} so "id-cards" isn't taken for an id
+@app.get("/residents/id-cards")
+def print_id_cards(
+    barangay: str = Query(None),
+    purok: str = Query(None),
+    search: str = Query(None),
+    sector: str = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access only")
+
+    target_barangay = resident_barangay_label(barangay)
+
+    # Read everything up front: the session is released before streaming
+    cards = id_card_service.load_cards(
+        db, barangay=target_barangay, purok=purok, search=search, sector=sector
+    )
+
+    if not cards:
+        raise HTTPException(status_code=404, detail="No residents match the filter")
+
+    if len(cards) > id_card_service.ID_CARD_MAX_CARDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"More than {id_card_service.ID_CARD_MAX_CARDS} residents match; narrow the filter (e.g. by purok)"
+        )
+
+    clean_name = (
+        target_barangay.replace(" ", "_")
+        if target_barangay else "All"
+    )
+
+    return StreamingResponse(
+        id_card_service.stream_id_cards_pdf(cards),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="SanFelipe_ID_Cards_{clean_name}.pdf"'}
+    )
+
 @app.put("/residents/{resident_id}/archive")
 def archive_resident(
     resident_id: int,
@@ -595,6 +900,7 @@ def promote_family_head(
     resident.status = "Active"
     resident.is_archived = False
 
+    bump_data_version(db, resident.barangay)
     db.commit()
 
     return {"message": "Family head successfully replaced"}
@@ -660,6 +966,7 @@ def promote_spouse_to_head(
     resident.status = "Active"
     resident.is_archived = False
 
+    bump_data_version(db, resident.barangay)
     db.commit()
 
     return {"message": "Spouse promoted to head successfully"}
@@ -677,19 +984,10 @@ def read_residents(skip: int = 0,
                    sector: str = Query(None),
                    sort_by: str = Query("last_name"),
                    sort_order: str = Query("asc"),
-                   db: Session = Depends(get_db),
-                   current_user: models.User = Depends(get_current_user)):
-
-    filter_barangay = barangay
+                   db: Session = Depends(get_read_db),
+                   scope: Optional[str] = Depends(get_barangay_scope)):
 
-    if current_user.role != "admin":
-        username_lower = current_user.username.lower()
-        official_name = None
-        for key in BARANGAY_MAPPING:
-            if key in username_lower:
-                official_name = BARANGAY_MAPPING[key]
-                break
-        filter_barangay = official_name or current_user.username.replace("_", " ").title()
+    filter_barangay = scope or resident_barangay_label(barangay)
 
     total = crud.get_resident_count(db, search, filter_barangay, sector)
 
@@ -707,7 +1005,7 @@ def read_residents(skip: int = 0,
 
 @app.get("/residents/{resident_id}", response_model=schemas.Resident)
 def read_resident(resident_id: int,
-                  db: Session = Depends(get_db),
+                  db: Session = Depends(get_read_db),
                   current_user: models.User = Depends(get_current_user)):
 
     resident = crud.get_resident(db, resident_id)
@@ -719,33 +1017,69 @@ def read_resident(resident_id: int,
 @app.get("/residents/code/{resident_code}/qr")
 def generate_resident_qr(
     resident_code: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    format: str = Query("png"),
+    size: int = Query(qr_service.QR_DEFAULT_BOX_SIZE, ge=qr_service.QR_MIN_BOX_SIZE, le=qr_service.QR_MAX_BOX_SIZE),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # ✅ Restrict to admin only
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access only")
 
-    resident = db.query(models.ResidentProfile).filter(
+    if format not in qr_service.QR_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format. Use one of: {', '.join(qr_service.QR_FORMATS)}"
+        )
+
+    exists = db.query(models.ResidentProfile.id).filter(
         models.ResidentProfile.resident_code == resident_code,
         models.ResidentProfile.is_deleted == False
     ).first()
 
-    if not resident:
+    if not exists:
         raise HTTPException(status_code=404, detail="Resident not found")
 
-    qr = qrcode.make(resident.resident_code)
+    # The image depends only on the code, so browsers may keep it for good
+    etag = qr_service.qr_etag(resident_code, format, size)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+
+    # Revalidation needs no render: the ETag comes from the inputs
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    qr = qr_service.render_qr(resident_code, format, size)
+    return Response(content=qr.content, media_type=qr.media_type, headers=headers)
+
+# Scanner fast path: one indexed lookup on resident_code (or none, when
+# cached) and no relationship loads.
+@app.get("/residents/code/{resident_code}/verify", response_model=schemas.ResidentVerification)
+def verify_resident_code(
+    resident_code: str,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access only")
+
+    payload = verification_service.get_verification_json(db, resident_code)
 
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    buffer.seek(0)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Resident not found")
 
-    return StreamingResponse(buffer, media_type="image/png")
+    return Response(content=payload, media_type="application/json")
 
 @app.get("/residents/code/{resident_code}", response_model=schemas.Resident)
 def get_resident_by_code(
     resident_code: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -808,14 +1142,30 @@ def restore_resident(resident_id: int,
 # DASHBOARD
 # ---------------------------------------------------
 
-@app.get("/dashboard/stats", response_model=schemas.DashboardStats)
-def get_stats(db: Session = Depends(get_db),
-              current_user: models.User = Depends(get_current_user)):
+# Stats are cached per worker and scope, tagged with the scope's data
+# version: one indexed lookup decides whether they are still current.
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "64"))
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "3600"))
 
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403)
+dashboard_cache = TTLCache(maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL)
+
+def load_dashboard_stats(db: Session, barangay: str = None):
+    key = version_key(barangay)
+    version = get_data_version(db, barangay)
+
+    cached = dashboard_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    stats = crud.get_dashboard_stats(db, barangay=barangay)
+    dashboard_cache.set(key, (version, stats))
+    return stats
+
+@app.get("/dashboard/stats", response_model=schemas.DashboardStats)
+def get_stats(db: Session = Depends(get_read_db),
+              scope: Optional[str] = Depends(get_barangay_scope)):
 
-    return crud.get_dashboard_stats(db)
+    return load_dashboard_stats(db, barangay=scope)
 
 # ---------------------------------------------------
 # Import/Export
@@ -831,109 +1181,224 @@ async def import_residents_excel(
     if current_user.role != "admin":
         raise HTTPException(status_code=403)
 
+    # pandas is only loaded by workers that actually import a file
+    from services.import_service import process_excel_import
+
     contents = await file.read()
 
-    return process_excel_import(io.BytesIO(contents), db, sheet_name=sheet_name)
+    # pandas parsing and the bulk inserts are synchronous; run them in the
+    # threadpool so the event loop keeps serving other requests.
+    return await run_in_threadpool(
+        process_excel_import, io.BytesIO(contents), db, sheet_name=sheet_name
+    )
 
-@app.get("/export/excel")
-def export_residents_excel(
-    barangay: str = Query(None),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+def cached_file_response(
+    request: Request,
+    export: export_cache.CachedExport,
+    media_type: str,
+    filename: str
 ):
-    # Restrict barangay automatically for non-admin
-    target_barangay = barangay
+    headers = {
+        "ETag": export.etag,
+        "Last-Modified": format_datetime(export.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
 
-    if current_user.role != "admin":
-        official_name = BARANGAY_MAPPING.get(current_user.username.lower())
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
 
-        if official_name:
-            target_barangay = official_name
-        else:
-            target_barangay = current_user.username.replace("_", " ").title()
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if export.etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
 
-    try:
-        excel_file = report_service.generate_household_excel(
-            db,
-            barangay_name=target_barangay
-        )
+    elif if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            since = None
 
-        clean_name = (
-            target_barangay.replace(" ", "_")
-            if target_barangay else "All"
-        )
+        if since and since.tzinfo and export.last_modified <= since:
+            return Response(status_code=304, headers=headers)
 
-        filename = f"SanFelipe_Households_{clean_name}.xlsx"
+    return FileResponse(
+        export.path,
+        media_type=media_type,
+        filename=filename,
+        headers=headers
+    )
 
-        return StreamingResponse(
-            iter([excel_file.getvalue()]),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/export/excel")
 def export_residents_excel(
+    request: Request,
     barangay: str = Query(None),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    scope: Optional[str] = Depends(get_barangay_scope)
 ):
-    # Restrict barangay automatically for non-admin
-    target_barangay = barangay
+    target_barangay = scope or resident_barangay_label(barangay)
 
-    if current_user.role != "admin":
-        official_name = BARANGAY_MAPPING.get(current_user.username.lower())
+    try:
+        export = export_cache.get_export(db, target_barangay, "xlsx")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if official_name:
-            target_barangay = official_name
-        else:
-            target_barangay = current_user.username.replace("_", " ").title()
+    clean_name = (
+        target_barangay.replace(" ", "_")
+        if target_barangay else "All"
+    )
 
-    try:
-        excel_file = report_service.generate_household_excel(
-            db,
-            barangay_name=target_barangay
-        )
+    return cached_file_response(
+        request,
+        export,
+        media_type=export_cache.XLSX_MEDIA_TYPE,
+        filename=f"SanFelipe_Households_{clean_name}.xlsx"
+    )
 
-        clean_name = (
-            target_barangay.replace(" ", "_")
-            if target_barangay else "All"
-        )
+@app.get("/export/excel/municipal")
+def export_municipal_excel(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403)
+
+    try:
+        export = export_cache.get_export(db, None, "municipal")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        filename = f"SanFelipe_Households_{clean_name}.xlsx"
+    return cached_file_response(
+        request,
+        export,
+        media_type=export_cache.XLSX_MEDIA_TYPE,
+        filename="SanFelipe_Households_Municipal.xlsx"
+    )
 
-        return StreamingResponse(
-            excel_file,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+@app.get("/export/master-list")
+def export_residents_data(
+    request: Request,
+    format: str = Query("csv"),
+    barangay: str = Query(None),
+    db: Session = Depends(get_read_db),
+    scope: Optional[str] = Depends(get_barangay_scope)
+):
+    if format not in export_service.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format. Use one of: {', '.join(export_service.EXPORT_FORMATS)}"
         )
 
+    target_barangay = scope or resident_barangay_label(barangay)
+    media_type, extension = export_cache.EXPORT_FORMATS[format]
+
+    try:
+        export = export_cache.get_export(db, target_barangay, format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    clean_name = (
+        target_barangay.replace(" ", "_")
+        if target_barangay else "All"
+    )
+
+    return cached_file_response(
+        request,
+        export,
+        media_type=media_type,
+        filename=f"SanFelipe_Households_{clean_name}.{extension}"
+    )
+
 # ---------------------------------------------------
 # REFERENCE DATA
 # ---------------------------------------------------
 
+# Reference tables only change through seed.py / migrations, so each
+# worker keeps plain-row copies for REFERENCE_CACHE_TTL seconds.
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "300"))
+
+REFERENCE_MODELS = {
+    "barangays": models.Barangay,
+    "puroks": models.Purok,
+    "sectors": models.Sector,
+    "relationships": models.Relationship,
+}
+
+reference_cache = TTLCache(maxsize=len(REFERENCE_MODELS), ttl=REFERENCE_CACHE_TTL)
+
+def load_reference_data(db: Session, name: str):
+    rows = reference_cache.get(name)
+
+    if rows is None:
+        model = REFERENCE_MODELS[name]
+        columns = [attr.key for attr in sa_inspect(model).column_attrs]
+        rows = [{key: getattr(row, key) for key in columns} for row in db.query(model).all()]
+        reference_cache.set(name, rows)
+
+    return rows
+
 @app.get("/barangays/")
-def get_barangays(db: Session = Depends(get_db),
+def get_barangays(db: Session = Depends(get_read_db),
                   current_user: models.User = Depends(get_current_user)):
-    return db.query(models.Barangay).all()
+    return load_reference_data(db, "barangays")
 
 @app.get("/puroks/")
-def get_puroks(db: Session = Depends(get_db),
+def get_puroks(db: Session = Depends(get_read_db),
                current_user: models.User = Depends(get_current_user)):
-    return db.query(models.Purok).all()
+    return load_reference_data(db, "puroks")
 
 @app.get("/sectors/")
-def get_sectors(db: Session = Depends(get_db),
+def get_sectors(db: Session = Depends(get_read_db),
                 current_user: models.User = Depends(get_current_user)):
-    return db.query(models.Sector).all()
+    return load_reference_data(db, "sectors")
 
 @app.get("/relationships/")
-def get_relationships(db: Session = Depends(get_db),
+def get_relationships(db: Session = Depends(get_read_db),
                       current_user: models.User = Depends(get_current_user)):
-    return db.query(models.Relationship).all()
+    return load_reference_data(db, "relationships")
+
+# ---------------------------------------------------
+# WARM-UP / READINESS
+# ---------------------------------------------------
+
+def warm_reference_data():
+    db = ReadSessionLocal()
+    try:
+        for name in REFERENCE_MODELS:
+            load_reference_data(db, name)
+    finally:
+        db.close()
+
+def warm_dashboard_stats():
+    db = ReadSessionLocal()
+    try:
+        # The all-barangay view (admins) and each barangay account's view
+        scopes = [None] + [
+            resident_barangay_label(row["name"])
+            for row in load_reference_data(db, "barangays")
+        ]
+        for scope in scopes:
+            load_dashboard_stats(db, scope)
+            db.rollback()
+    finally:
+        db.close()
+
+def warmup_steps():
+    steps = [("primary_pool", partial(warmup.open_pool, engine))]
+    if read_engine is not engine:
+        steps.append(("read_pool", partial(warmup.open_pool, read_engine)))
+
+    return steps + [
+        ("async_pool", partial(warmup.open_async_pool, async_engine)),
+        ("reference_data", warm_reference_data),
+        ("dashboard_stats", warm_dashboard_stats),
+    ]
+
+# Load balancer health check: 503 until this worker has warmed up
+@app.get("/ready", include_in_schema=False)
+def get_readiness():
+    snapshot = warmup.readiness.snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(snapshot, status_code=503)
+    return snapshot
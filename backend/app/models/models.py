@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Table, UniqueConstraint, Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Table, UniqueConstraint, Float, Index
 from sqlalchemy.orm import relationship as orm_relationship, relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -24,6 +24,9 @@ class User(Base):
     is_archived = Column(Boolean, default=False)
     archived_at = Column(DateTime(timezone=True), nullable=True)
 
+    # Barangay a non-admin account is restricted to (resolved once, not per request)
+    barangay_id = Column(Integer, ForeignKey("barangays.id"), nullable=True)
+
 # --- REFERENCE TABLES ---
 class Barangay(Base):
     __tablename__ = "barangays"
@@ -57,6 +60,14 @@ class ResidentProfile(Base):
             "barangay",
             name="uq_resident_identity"
         ),
+        # Added by migration 0004; process_excel_import's ON CONFLICT targets it
+        UniqueConstraint(
+            "last_name",
+            "first_name",
+            "middle_name",
+            "barangay",
+            name="unique_resident_identity"
+        ),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -166,3 +177,72 @@ class AuditLog(Base):
     target_type = Column(String)  # "resident", "user", "system"
     target_id = Column(Integer, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+# Export Data Versions
+class ExportVersion(Base):
+    __tablename__ = "export_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    barangay = Column(String, unique=True, index=True)  # "*" = all barangays
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Refresh Tokens (rotating, stored hashed)
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(32), primary_key=True)  # Token id, sent in clear as "<id>.<secret>"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    token_hash = Column(String(64), nullable=False)  # HMAC-SHA256 of the secret part
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String(32), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# --- INDEXES ---
+# Hot queries filter active rows (is_deleted = false) and compare or sort
+# on upper(...) expressions, so these are partial expression indexes
+# matching those exact expressions. Kept in step with
+# migrations/versions/0003_resident_indexes.py, which builds them
+# concurrently on existing databases.
+_active = ResidentProfile.is_deleted == False
+
+# Resident list: ORDER BY upper(last_name), upper(first_name)
+Index(
+    "ix_resident_profiles_active_name",
+    func.upper(ResidentProfile.last_name),
+    func.upper(ResidentProfile.first_name),
+    postgresql_where=_active
+)
+
+# Barangay-scoped lists, counts, dashboard and exports
+Index(
+    "ix_resident_profiles_active_barangay_name",
+    func.upper(ResidentProfile.barangay),
+    func.upper(ResidentProfile.last_name),
+    func.upper(ResidentProfile.first_name),
+    postgresql_where=_active
+)
+
+# Duplicate check in create_resident / update_resident
+Index(
+    "ix_resident_profiles_active_identity",
+    func.upper(func.coalesce(ResidentProfile.last_name, "")),
+    func.upper(func.coalesce(ResidentProfile.first_name, "")),
+    func.upper(func.coalesce(ResidentProfile.middle_name, "")),
+    ResidentProfile.birthdate,
+    postgresql_where=_active
+)
+
+# Archived residents list
+Index(
+    "ix_resident_profiles_deleted",
+    ResidentProfile.id,
+    postgresql_where=ResidentProfile.is_deleted == True
+)
+
+# Foreign keys used by joins and relationship loads
+Index("ix_family_members_profile_id", FamilyMember.profile_id)
+Index("ix_resident_assistance_resident_id", ResidentAssistance.resident_id)
+Index("ix_resident_sectors_resident_id", resident_sectors.c.resident_id)
+Index("ix_resident_sectors_sector_id", resident_sectors.c.sector_id)
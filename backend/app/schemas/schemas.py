@@ -171,6 +171,7 @@ class User(UserBase):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
     role: str
 
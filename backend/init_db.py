@@ -1,6 +1,5 @@
-from app.core.database import engine, Base
-import models
+from migrations import upgrade
 
-print("Creating database tables...")
-Base.metadata.create_all(bind=engine)
-print("Tables created successfully!")
\ No newline at end of file
+print("Applying migrations...")
+applied = upgrade()
+print(f"Applied {len(applied)} migration(s).")
\ No newline at end of file
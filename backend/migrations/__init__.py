@@ -0,0 +1,174 @@
+"""
+Versioned schema migrations.
+
+Each module in migrations/versions is named NNNN_description.py and
+defines upgrade(conn). Applied versions are recorded in the
+schema_migrations table, so running `python -m migrations upgrade`
+again only applies what is new. Migrations run before each deploy,
+never on app startup:
+
+- Railway: railway.json's preDeployCommand (Railway ignores the
+  Procfile's release line). It runs once per deploy, before the new
+  web instances start, and a failure stops the deploy.
+- Procfile-based hosts (Heroku, Dokku): the `release` process.
+- Locally: init_db.py / seed.py call upgrade().
+
+Applied migrations are never edited; a schema change gets a new
+version, so fresh and existing databases go through the same steps.
+
+A migration that sets TRANSACTIONAL = False runs on an autocommit
+connection instead of inside one transaction. Use that for
+CREATE INDEX CONCURRENTLY and batched backfills, and keep those
+migrations idempotent since a failure can leave them half applied.
+"""
+import importlib
+import logging
+import os
+import pkgutil
+import time
+from sqlalchemy import text
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+
+# pg_advisory_lock key so two release instances never migrate at once
+MIGRATION_LOCK_KEY = 830517
+
+
+# --------------------------------------------------
+# HELPERS (for use inside migrations)
+# --------------------------------------------------
+
+def create_index_concurrently(
+    conn, name: str, table: str, definition: str, where: str = None, unique: bool = False
+):
+    """
+    Builds an index without locking writes on the table. A failed
+    concurrent build leaves an INVALID index behind, so one is dropped
+    and rebuilt rather than skipped by IF NOT EXISTS.
+    """
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).scalar()
+
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    statement = f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({definition})"
+    if where:
+        statement += f" WHERE {where}"
+
+    conn.execute(text(statement))
+
+
+def drop_index_concurrently(conn, name: str):
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def backfill_in_batches(conn, statement: str, batch_size: int = BACKFILL_BATCH_SIZE, **params):
+    """
+    Repeats an UPDATE limited to :batch_size rows until it changes
+    nothing. On an autocommit connection every batch commits on its own,
+    so row locks are held briefly and progress survives a failure.
+    """
+    total = 0
+
+    while True:
+        changed = conn.execute(text(statement), {"batch_size": batch_size, **params}).rowcount
+        if not changed:
+            return total
+
+        total += changed
+        logger.info("Backfilled %s rows", total)
+
+
+# --------------------------------------------------
+# RUNNER
+# --------------------------------------------------
+
+def discover():
+    """All migration modules, ordered by version."""
+    from migrations import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        version, _, _ = module_info.name.partition("_")
+        if not version.isdigit():
+            continue
+
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append((version, module_info.name, module))
+
+    return sorted(migrations)
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version VARCHAR PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def applied_versions(conn):
+    rows = conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))
+    return {row[0] for row in rows}
+
+
+def _apply(version: str, name: str, module):
+    started = time.monotonic()
+    logger.info("Applying migration %s", name)
+
+    if getattr(module, "TRANSACTIONAL", True):
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            _record(conn, version, name)
+    else:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            module.upgrade(conn)
+        with engine.begin() as conn:
+            _record(conn, version, name)
+
+    logger.info("Applied migration %s in %.1fs", name, time.monotonic() - started)
+
+
+def _record(conn, version: str, name: str):
+    conn.execute(
+        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)"),
+        {"version": version, "name": name}
+    )
+
+
+def pending():
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        done = applied_versions(conn)
+
+    return [m for m in discover() if m[0] not in done]
+
+
+def upgrade():
+    """Applies every pending migration in order. Returns their names."""
+    applied = []
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        try:
+            # Read after taking the lock: another instance may have just finished
+            for version, name, module in pending():
+                _apply(version, name, module)
+                applied.append(name)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+    return applied
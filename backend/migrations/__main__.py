@@ -0,0 +1,27 @@
+import argparse
+import logging
+import sys
+from migrations import pending, upgrade
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.command == "status":
+        names = [name for _, name, _ in pending()]
+        print("Pending migrations:" if names else "Database is up to date.")
+        for name in names:
+            print(f"  {name}")
+        return 1 if names else 0
+
+    applied = upgrade()
+    print(f"Applied {len(applied)} migration(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
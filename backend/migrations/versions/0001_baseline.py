@@ -0,0 +1,206 @@
+"""
+Tables as they existed when create_all ran on app startup, written out
+as the DDL create_all produced for them. Frozen: it must not follow
+later model changes (those get their own migration), so a fresh
+database goes through exactly the same steps as an existing one.
+
+Existing databases already have these tables; IF NOT EXISTS skips
+them. users.barangay_id is added by 0002.
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    # --- Reference tables ---
+    """
+    CREATE TABLE IF NOT EXISTS barangays (
+        id SERIAL NOT NULL,
+        name VARCHAR,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_barangays_id ON barangays (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_barangays_name ON barangays (name)",
+
+    """
+    CREATE TABLE IF NOT EXISTS puroks (
+        id SERIAL NOT NULL,
+        name VARCHAR,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_puroks_id ON puroks (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_puroks_name ON puroks (name)",
+
+    """
+    CREATE TABLE IF NOT EXISTS relationships (
+        id SERIAL NOT NULL,
+        name VARCHAR,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_relationships_id ON relationships (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_relationships_name ON relationships (name)",
+
+    """
+    CREATE TABLE IF NOT EXISTS sectors (
+        id SERIAL NOT NULL,
+        name VARCHAR,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_sectors_id ON sectors (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_sectors_name ON sectors (name)",
+
+    # --- Users ---
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL NOT NULL,
+        username VARCHAR,
+        hashed_password VARCHAR,
+        role VARCHAR,
+        failed_attempts INTEGER,
+        locked_until TIMESTAMP WITHOUT TIME ZONE,
+        is_archived BOOLEAN,
+        archived_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)",
+
+    # --- Residents ---
+    """
+    CREATE TABLE IF NOT EXISTS resident_profiles (
+        id SERIAL NOT NULL,
+        resident_code VARCHAR(20) NOT NULL,
+        is_deleted BOOLEAN,
+        deleted_at TIMESTAMP WITHOUT TIME ZONE,
+        is_archived BOOLEAN,
+        is_family_head BOOLEAN,
+        status VARCHAR,
+        last_name VARCHAR,
+        first_name VARCHAR,
+        middle_name VARCHAR,
+        ext_name VARCHAR,
+        house_no VARCHAR,
+        purok VARCHAR,
+        barangay VARCHAR,
+        spouse_last_name VARCHAR,
+        spouse_first_name VARCHAR,
+        spouse_middle_name VARCHAR,
+        spouse_ext_name VARCHAR,
+        birthdate DATE,
+        sex VARCHAR,
+        civil_status VARCHAR,
+        religion VARCHAR,
+        precinct_no VARCHAR,
+        occupation VARCHAR,
+        contact_no VARCHAR,
+        other_sector_details VARCHAR,
+        sector_summary VARCHAR,
+        photo_url VARCHAR,
+        is_active BOOLEAN,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_resident_identity UNIQUE (last_name, first_name, birthdate, barangay)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_resident_profiles_id ON resident_profiles (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_resident_profiles_resident_code ON resident_profiles (resident_code)",
+    "CREATE INDEX IF NOT EXISTS ix_resident_profiles_last_name ON resident_profiles (last_name)",
+    "CREATE INDEX IF NOT EXISTS ix_resident_profiles_first_name ON resident_profiles (first_name)",
+    "CREATE INDEX IF NOT EXISTS ix_resident_profiles_purok ON resident_profiles (purok)",
+    "CREATE INDEX IF NOT EXISTS ix_resident_profiles_barangay ON resident_profiles (barangay)",
+
+    """
+    CREATE TABLE IF NOT EXISTS family_members (
+        id SERIAL NOT NULL,
+        profile_id INTEGER,
+        last_name VARCHAR,
+        first_name VARCHAR,
+        middle_name VARCHAR,
+        ext_name VARCHAR,
+        relationship VARCHAR,
+        birthdate DATE,
+        occupation VARCHAR,
+        is_active BOOLEAN,
+        is_family_head BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY (profile_id) REFERENCES resident_profiles (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_family_members_id ON family_members (id)",
+
+    """
+    CREATE TABLE IF NOT EXISTS resident_assistance (
+        id SERIAL NOT NULL,
+        resident_id INTEGER,
+        type_of_assistance VARCHAR NOT NULL,
+        date_processed DATE,
+        date_claimed DATE,
+        amount FLOAT,
+        implementing_office VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (resident_id) REFERENCES resident_profiles (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_resident_assistance_id ON resident_assistance (id)",
+
+    """
+    CREATE TABLE IF NOT EXISTS resident_sectors (
+        resident_id INTEGER,
+        sector_id INTEGER,
+        FOREIGN KEY (resident_id) REFERENCES resident_profiles (id),
+        FOREIGN KEY (sector_id) REFERENCES sectors (id)
+    )
+    """,
+
+    # --- System ---
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id SERIAL NOT NULL,
+        user_id INTEGER,
+        action VARCHAR,
+        target_type VARCHAR,
+        target_id INTEGER,
+        timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_id ON audit_logs (id)",
+
+    """
+    CREATE TABLE IF NOT EXISTS export_versions (
+        id SERIAL NOT NULL,
+        barangay VARCHAR,
+        version INTEGER NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_export_versions_id ON export_versions (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_export_versions_barangay ON export_versions (barangay)",
+
+    """
+    CREATE TABLE IF NOT EXISTS refresh_tokens (
+        id VARCHAR(32) NOT NULL,
+        user_id INTEGER NOT NULL,
+        token_hash VARCHAR(64) NOT NULL,
+        expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        revoked_at TIMESTAMP WITHOUT TIME ZONE,
+        replaced_by VARCHAR(32),
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens (user_id)",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
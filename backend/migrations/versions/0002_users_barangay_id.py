@@ -0,0 +1,32 @@
+"""
+users.barangay_id, previously added by an ALTER on app startup, and a
+backfill for barangay accounts created before it existed.
+"""
+from sqlalchemy import text
+from app.core.barangay_scope import match_barangay
+
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS "
+        "barangay_id INTEGER REFERENCES barangays(id)"
+    ))
+
+    barangays = conn.execute(text("SELECT id, name FROM barangays")).all()
+
+    # Matching is done in Python (same rules as login), one small
+    # update per account; the users table is tiny so no batching needed.
+    users = conn.execute(text(
+        "SELECT id, username FROM users "
+        "WHERE barangay_id IS NULL AND role != 'admin'"
+    )).all()
+
+    for user_id, username in users:
+        barangay = match_barangay(barangays, username)
+        if barangay:
+            conn.execute(
+                text("UPDATE users SET barangay_id = :barangay_id WHERE id = :id"),
+                {"barangay_id": barangay.id, "id": user_id}
+            )
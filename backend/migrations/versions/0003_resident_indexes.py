@@ -0,0 +1,35 @@
+"""
+Partial expression indexes for active residents and foreign key
+indexes, built concurrently so resident_profiles stays writable.
+Definitions mirror the Index() declarations in app/models/models.py.
+"""
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+ACTIVE = "is_deleted = false"
+
+INDEXES = [
+    ("ix_resident_profiles_active_name", "resident_profiles",
+     "upper(last_name), upper(first_name)", ACTIVE),
+
+    ("ix_resident_profiles_active_barangay_name", "resident_profiles",
+     "upper(barangay), upper(last_name), upper(first_name)", ACTIVE),
+
+    ("ix_resident_profiles_active_identity", "resident_profiles",
+     "upper(coalesce(last_name, '')), upper(coalesce(first_name, '')), "
+     "upper(coalesce(middle_name, '')), birthdate", ACTIVE),
+
+    ("ix_resident_profiles_deleted", "resident_profiles",
+     "id", "is_deleted = true"),
+
+    ("ix_family_members_profile_id", "family_members", "profile_id", None),
+    ("ix_resident_assistance_resident_id", "resident_assistance", "resident_id", None),
+    ("ix_resident_sectors_resident_id", "resident_sectors", "resident_id", None),
+    ("ix_resident_sectors_sector_id", "resident_sectors", "sector_id", None),
+]
+
+
+def upgrade(conn):
+    for name, table, definition, where in INDEXES:
+        create_index_concurrently(conn, name, table, definition, where=where)
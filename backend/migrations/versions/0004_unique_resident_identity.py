@@ -0,0 +1,47 @@
+"""
+The (last_name, first_name, middle_name, barangay) constraint that
+process_excel_import's ON CONFLICT relies on. Production databases
+already have it (added by hand); new databases did not.
+
+The unique index is built concurrently and then attached as the
+constraint, so resident_profiles stays writable. Duplicates are checked
+first: they would make the concurrent build fail halfway.
+"""
+from sqlalchemy import text
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+CONSTRAINT = "unique_resident_identity"
+COLUMNS = "last_name, first_name, middle_name, barangay"
+
+
+def upgrade(conn):
+    exists = conn.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = :name"
+    ), {"name": CONSTRAINT}).scalar()
+
+    if exists:
+        return
+
+    duplicates = conn.execute(text(f"""
+        SELECT {COLUMNS}, count(*) FROM resident_profiles
+        GROUP BY {COLUMNS}
+        HAVING count(*) > 1
+        ORDER BY count(*) DESC
+        LIMIT 20
+    """)).all()
+
+    if duplicates:
+        listed = "\n".join(f"  {tuple(row[:4])} x{row[4]}" for row in duplicates)
+        raise RuntimeError(
+            f"resident_profiles has duplicate ({COLUMNS}) rows; merge or rename "
+            f"them before adding {CONSTRAINT}:\n{listed}"
+        )
+
+    create_index_concurrently(conn, CONSTRAINT, "resident_profiles", COLUMNS, unique=True)
+
+    # Only a short catalog lock: the index is already built and valid
+    conn.execute(text(
+        f"ALTER TABLE resident_profiles ADD CONSTRAINT {CONSTRAINT} UNIQUE USING INDEX {CONSTRAINT}"
+    ))
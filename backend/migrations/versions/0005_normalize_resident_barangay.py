@@ -0,0 +1,63 @@
+"""
+Rewrites resident_profiles.barangay to the resident barangay label
+(trimmed, upper case, known spellings mapped: 'Santo Nino ' -> 'STO NIÑO').
+Barangay filtering is an exact match on upper(barangay) (see
+crud.apply_barangay_filter), so values with stray whitespace or other
+spellings would otherwise drop out of barangay accounts and exports.
+
+Batched per distinct value. A row is left as it was when another row
+already has its identity under the new label (the unique constraints
+would reject it); those are logged for manual merging.
+"""
+import logging
+from sqlalchemy import text
+from app.core.barangay_scope import resident_barangay_label
+from migrations import backfill_in_batches
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONAL = False
+
+NORMALIZE = """
+    UPDATE resident_profiles SET barangay = :label
+    WHERE id IN (
+        SELECT p.id FROM resident_profiles p
+        WHERE p.barangay = :value
+          AND NOT EXISTS (
+              SELECT 1 FROM resident_profiles o
+              WHERE o.barangay = :label
+                AND o.last_name = p.last_name
+                AND o.first_name = p.first_name
+                AND (o.middle_name = p.middle_name OR o.birthdate = p.birthdate)
+          )
+        LIMIT :batch_size
+    )
+"""
+
+
+def upgrade(conn):
+    values = conn.execute(text(
+        "SELECT DISTINCT barangay FROM resident_profiles WHERE barangay IS NOT NULL"
+    )).scalars().all()
+
+    changed = 0
+    for value in values:
+        label = resident_barangay_label(value)
+        if not label or label == value:
+            continue
+
+        changed += backfill_in_batches(conn, NORMALIZE, value=value, label=label)
+
+        left = conn.execute(
+            text("SELECT count(*) FROM resident_profiles WHERE barangay = :value"),
+            {"value": value}
+        ).scalar()
+        if left:
+            logger.warning(
+                "%s resident(s) kept barangay %r: the same person already exists under %r",
+                left, value, label
+            )
+
+    if changed:
+        # Cached exports and dashboards were built from the old values
+        conn.execute(text("UPDATE export_versions SET version = version + 1, updated_at = now()"))
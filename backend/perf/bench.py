@@ -0,0 +1,334 @@
+"""
+Benchmarks for the hot paths, run against the configured (local)
+PostgreSQL after `python -m perf.synthetic populate`.
+
+    python -m perf.bench [--iterations 20] [--only list] [--compare <sha>]
+
+Each case reports latency percentiles, SQL statements per call and peak
+Python memory (a separate tracemalloc run, so tracing doesn't skew the
+timings). Worker startup is measured too: cold `import app.main` time
+in fresh interpreters, broken down by top-level package. Results are
+written to perf/results/<git sha>.json; --compare prints the change
+against an earlier commit's results.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app import crud, models
+from app.core.database import SessionLocal, engine
+from perf.synthetic import write_import_workbook
+from services import export_service, report_service
+from services.import_service import process_excel_import
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --------------------------------------------------
+# MEASUREMENT
+# --------------------------------------------------
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(run, iterations: int):
+    """Times `run` (given a fresh session) and returns a result dict."""
+    run_once(run)  # warm-up: connection, caches, imports
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            run_once(run)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+
+    tracemalloc.start()
+    try:
+        run_once(run)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "queries": max(queries),
+        "peak_mib": round(peak / 1024 / 1024, 2),
+    }
+
+
+def run_once(run):
+    db = SessionLocal()
+    try:
+        run(db)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def run_in_rolled_back_transaction(run):
+    """For cases that commit: their commits become savepoints of an outer
+    transaction that is rolled back, so the data set stays the same."""
+    def wrapped(_):
+        connection = engine.connect()
+        outer = connection.begin()
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            run(db)
+        finally:
+            db.close()
+            outer.rollback()
+            connection.close()
+    return wrapped
+
+
+def measure_startup(runs: int = 5, top: int = 15):
+    """
+    Cold import of app.main (what a new uvicorn worker pays before it
+    can serve), median of `runs` fresh interpreters, plus a
+    `-X importtime` breakdown of self time per top-level package.
+    """
+    command = [sys.executable, "-c", "import app.main"]
+
+    wall = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=BACKEND_DIR, check=True, capture_output=True)
+        wall.append((time.perf_counter() - started) * 1000)
+
+    traced = subprocess.run(
+        [sys.executable, "-X", "importtime"] + command[1:],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    )
+
+    # Lines look like "import time:   self [us] | cumulative | [indent]package"
+    by_package = defaultdict(int)
+    for line in traced.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "wall_ms": round(statistics.median(wall), 1),
+        "import_ms": round(sum(by_package.values()) / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in packages},
+    }
+
+
+def print_startup(startup: dict):
+    print(f"\nstartup: import app.main {startup['wall_ms']:.0f} ms wall, "
+          f"{startup['import_ms']:.0f} ms in imports")
+    for name, ms in startup["packages_ms"].items():
+        print(f"  {name:24} {ms:>8.1f} ms")
+
+
+# --------------------------------------------------
+# CASES
+# --------------------------------------------------
+
+def busiest_barangay():
+    db = SessionLocal()
+    try:
+        return db.query(models.ResidentProfile.barangay).filter(
+            models.ResidentProfile.is_deleted == False
+        ).group_by(models.ResidentProfile.barangay).order_by(
+            func.count().desc()
+        ).limit(1).scalar()
+    finally:
+        db.close()
+
+
+# Exports are timed through the builders export_cache runs for the
+# routes, writing to a temp file, so the cache never answers instead.
+
+def excel_export(db: Session, barangay: str):
+    path = report_service.generate_household_excel_file(db, barangay)
+    os.remove(path)
+
+
+def municipal_export(db: Session):
+    fd, path = tempfile.mkstemp(prefix="sanfelipe_bench_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        report_service.write_municipal_excel(db, path)
+    finally:
+        os.remove(path)
+
+
+def csv_export(db: Session, barangay: str):
+    for _ in export_service.stream_household_csv(db, barangay):
+        pass
+
+
+def build_cases(workbook_bytes: bytes):
+    barangay = busiest_barangay()
+
+    return {
+        "list.page10": lambda db: crud.get_residents(db, limit=10),
+        "list.page100": lambda db: crud.get_residents(db, limit=100),
+        "list.deep_page": lambda db: crud.get_residents(db, skip=5000, limit=20),
+        "list.search": lambda db: crud.get_residents(db, search="DELA CRUZ"),
+        "list.barangay": lambda db: crud.get_residents(db, barangay=barangay),
+        "list.barangay_sector": lambda db: crud.get_residents(db, barangay=barangay, sector="senior citizen"),
+        "count.search": lambda db: crud.get_resident_count(db, search="MARIA"),
+        "dashboard.all": lambda db: crud.get_dashboard_stats(db),
+        "dashboard.barangay": lambda db: crud.get_dashboard_stats(db, barangay=barangay),
+        "export.excel_barangay": lambda db: excel_export(db, barangay),
+        "export.excel_municipal": municipal_export,
+        "export.csv_barangay": lambda db: csv_export(db, barangay),
+        "import.workbook": run_in_rolled_back_transaction(
+            lambda db: process_excel_import(io.BytesIO(workbook_bytes), db)
+        ),
+    }
+
+
+# --------------------------------------------------
+# RESULTS
+# --------------------------------------------------
+
+def git_revision():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"]) != 0
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def dataset_size():
+    db = SessionLocal()
+    try:
+        return {
+            "residents": db.query(func.count(models.ResidentProfile.id)).scalar(),
+            "family_members": db.query(func.count(models.FamilyMember.id)).scalar(),
+        }
+    finally:
+        db.close()
+
+
+def save_results(revision: str, results: dict, startup: dict = None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{revision}.json")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "revision": revision,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "dataset": dataset_size(),
+            "cases": results,
+            "startup": startup,
+        }, f, indent=2)
+
+    return path
+
+
+def load_results(name: str):
+    path = name if name.endswith(".json") else os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_comparison(current: dict, baseline: dict, startup: dict = None):
+    print(f"\nCompared with {baseline['revision']} ({baseline['dataset']}):")
+
+    if startup and baseline.get("startup"):
+        print(f"  {'startup':24} wall {baseline['startup']['wall_ms']:>9.1f} -> {startup['wall_ms']:>9.1f} ms")
+
+    for name, now in current.items():
+        before = baseline["cases"].get(name)
+        if not before:
+            continue
+
+        change = (now["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        flag = "  <-- slower" if change > 10 else ""
+        print(
+            f"  {name:24} p50 {before['p50_ms']:>9.1f} -> {now['p50_ms']:>9.1f} ms ({change:+.0f}%)"
+            f"  queries {before['queries']} -> {now['queries']}{flag}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m perf.bench")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", help="Run cases whose name contains this")
+    parser.add_argument("--import-rows", type=int, default=1000)
+    parser.add_argument("--compare", help="Revision (or results file) to compare with")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true")
+    args = parser.parse_args(argv)
+
+    startup = None
+    if not args.skip_startup:
+        startup = measure_startup()
+        print_startup(startup)
+        print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_import_workbook(os.path.join(tmp, "import.xlsx"), args.import_rows, seed=9001)
+        with open(path, "rb") as f:
+            workbook_bytes = f.read()
+
+    results = {}
+    for name, run in build_cases(workbook_bytes).items():
+        if args.only and args.only not in name:
+            continue
+
+        # Exports/imports are slow; fewer iterations keep the suite short
+        iterations = args.iterations if name.startswith(("list", "count", "dashboard")) else max(3, args.iterations // 5)
+        result = results[name] = measure(run, iterations)
+        print(
+            f"{name:24} p50 {result['p50_ms']:>9.1f}  p95 {result['p95_ms']:>9.1f}  "
+            f"p99 {result['p99_ms']:>9.1f} ms  queries {result['queries']:>4}  "
+            f"peak {result['peak_mib']:>7.1f} MiB"
+        )
+
+    if not args.no_save:
+        print(f"\nSaved {save_results(git_revision(), results, startup)}")
+
+    if args.compare:
+        print_comparison(results, load_results(args.compare), startup)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Checks that the hot resident queries are served by the index meant for
+them.
+
+Runs each crud/report query against the configured database, captures
+the SQL it actually sends, and EXPLAINs it with enable_seqscan = off
+(so an empty or small database plans like a large one). Every index
+listed for a query must appear in its plans. "No Seq Scan" alone proves
+little: the planner can walk any partial index on is_deleted = false
+end to end when nothing else matches, so a query whose expression no
+longer matches its index would still pass.
+
+    python -m perf.explain_check [--barangay "SAN RAFAEL"]
+
+Exits non-zero if an expected index is missing from a plan or a listed
+table is read by a sequential scan. Needs a migrated database; an empty
+one is enough.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from sqlalchemy import event, text
+from app import crud, models
+from app.core.database import SessionLocal
+from services import report_service
+
+CHECKED_TABLES = {
+    "resident_profiles",
+    "family_members",
+    "resident_assistance",
+    "resident_sectors",
+}
+
+
+ACTIVE_NAME = "ix_resident_profiles_active_name"
+ACTIVE_BARANGAY_NAME = "ix_resident_profiles_active_barangay_name"
+ACTIVE_IDENTITY = "ix_resident_profiles_active_identity"
+DELETED = "ix_resident_profiles_deleted"
+RESIDENT_PK = ("resident_profiles_pkey", "ix_resident_profiles_id")
+FAMILY_FK = "ix_family_members_profile_id"
+ASSISTANCE_FK = "ix_resident_assistance_resident_id"
+SECTORS_FK = "ix_resident_sectors_resident_id"
+
+
+def hot_queries(barangay: str):
+    """
+    label -> (run, expected) where each expected entry is an index name,
+    or a tuple of names any one of which will do.
+    """
+    return {
+        "resident list": (
+            lambda db: crud.get_residents(db),
+            [ACTIVE_NAME, FAMILY_FK, ASSISTANCE_FK, SECTORS_FK],
+        ),
+        "resident list (barangay)": (
+            lambda db: crud.get_residents(db, barangay=barangay),
+            [ACTIVE_BARANGAY_NAME, FAMILY_FK],
+        ),
+        "resident count (barangay)": (
+            lambda db: crud.get_resident_count(db, barangay=barangay),
+            [ACTIVE_BARANGAY_NAME],
+        ),
+        "resident detail": (
+            lambda db: crud.get_resident(db, 1),
+            [RESIDENT_PK, FAMILY_FK, ASSISTANCE_FK, SECTORS_FK],
+        ),
+        "duplicate check": (
+            lambda db: crud.find_duplicate_resident(
+                db, "JUAN", "", "DELA CRUZ", date(1990, 1, 1), exclude_id=1
+            ),
+            [ACTIVE_IDENTITY],
+        ),
+        "dashboard (barangay)": (
+            lambda db: crud.get_dashboard_stats(db, barangay=barangay),
+            [ACTIVE_BARANGAY_NAME],
+        ),
+        "household export (barangay)": (
+            lambda db: report_service.household_query(db, barangay).limit(50).all(),
+            [ACTIVE_BARANGAY_NAME, FAMILY_FK],
+        ),
+        "archived list": (
+            lambda db: db.query(models.ResidentProfile).filter(
+                models.ResidentProfile.is_deleted == True
+            ).all(),
+            [DELETED],
+        ),
+    }
+
+
+def capture_statements(db, run):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        run(db)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    return statements
+
+
+def seq_scans(plan):
+    """Tables read by a Seq Scan anywhere in a JSON plan tree."""
+    found = []
+
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+
+    return found
+
+
+def index_names(plan):
+    """Indexes read anywhere in a JSON plan tree."""
+    found = set()
+
+    if plan.get("Index Name"):
+        found.add(plan["Index Name"])
+
+    for child in plan.get("Plans", []):
+        found |= index_names(child)
+
+    return found
+
+
+def missing_indexes(expected, used):
+    missing = []
+    for entry in expected:
+        names = entry if isinstance(entry, tuple) else (entry,)
+        if not used.intersection(names):
+            missing.append(" or ".join(names))
+    return missing
+
+
+def explain(db, statement, parameters):
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m perf.explain_check")
+    parser.add_argument("--barangay", default="SAN RAFAEL")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    db = SessionLocal()
+
+    try:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for label, (run, expected) in hot_queries(args.barangay).items():
+            scanned = set()
+            used = set()
+            for statement, parameters in capture_statements(db, run):
+                plan = explain(db, statement, parameters)
+                scanned.update(seq_scans(plan))
+                used |= index_names(plan)
+
+            problems = []
+            missing = missing_indexes(expected, used)
+            if missing:
+                problems.append(f"not using {', '.join(missing)}")
+            if scanned:
+                problems.append(f"sequential scan on {', '.join(sorted(scanned))}")
+
+            if problems:
+                failures += 1
+                print(f"FAIL  {label}: {'; '.join(problems)} (used: {', '.join(sorted(used)) or 'none'})")
+            else:
+                print(f"ok    {label}: {', '.join(sorted(used))}")
+    finally:
+        db.rollback()
+        db.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""
+HTTP load harness modelling profiling-drive traffic.
+
+Start one worker the way the Procfile does, against a local database
+filled with `python -m perf.synthetic populate`:
+
+    uvicorn app.main:app --port 8000
+    python -m perf.loadtest --users 20 --duration 120
+
+Each virtual user logs in as a barangay account (usernames as created
+by seed.py, password from BARANGAY_DEFAULT_PASSWORD) and works like an
+encoder: pages and searches the list, opens and edits residents, adds
+new households and refreshes the dashboard, pausing between actions.
+One admin user (ADMIN_PASSWORD) adds QR lookups and scan verifications,
+exports and imports.
+Creates and imports write real rows, so use a disposable database.
+
+Reports throughput, latency percentiles and error rate per endpoint.
+Needs the packages in requirements-dev.txt.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+import httpx
+from perf.synthetic import FEMALE_FIRST_NAMES, LAST_NAMES, MALE_FIRST_NAMES, write_import_workbook
+
+BARANGAY_USERS = [
+    "amagna", "apostol", "balincaguing", "faranal", "feria", "manglicmot",
+    "rosete", "sanrafael", "santonino", "sindol", "maloma",
+]
+
+SEARCH_TERMS = ["DELA", "SANTOS", "MARIA", "JUAN", "REYES CRUZ", "GARCIA", "SF-0001"]
+
+# (action, weight) for barangay encoders and for the admin user
+ENCODER_MIX = [
+    ("list", 35),
+    ("search", 15),
+    ("detail", 12),
+    ("dashboard", 10),
+    ("create", 10),
+    ("update", 6),
+    ("reference", 5),
+    ("export", 2),
+]
+
+ADMIN_MIX = [
+    ("list", 20),
+    ("qr_lookup", 10),
+    ("qr_verify", 15),
+    ("dashboard", 20),
+    ("export", 10),
+    ("export_master_list", 5),
+    ("import", 2),
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, elapsed, status):
+        self.latencies[name].append(elapsed * 1000)
+        self.status_codes[name][status] += 1
+        if status >= 400 or status == 0:
+            self.errors[name] += 1
+
+    def report(self, duration):
+        rows = {}
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+
+            def pct(p):
+                return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 1)
+
+            rows[name] = {
+                "requests": len(values),
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": pct(50),
+                "p95_ms": pct(95),
+                "p99_ms": pct(99),
+                "max_ms": round(ordered[-1], 1),
+                "error_rate": round(self.errors[name] / len(values), 4),
+                "status": dict(self.status_codes[name]),
+            }
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, client, recorder, rng, username, password, mix, think_time):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.username = username
+        self.password = password
+        self.mix = mix
+        self.think_time = think_time
+        self.headers = {}
+        self.known_ids = []
+        self.known_codes = []
+
+    async def request(self, name, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.recorder.record(name, time.perf_counter() - started, status)
+        return response
+
+    async def login(self):
+        response = await self.request(
+            "login", "POST", "/token",
+            data={"username": self.username, "password": self.password}
+        )
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"Login failed for {self.username}")
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def run(self, deadline):
+        await self.login()
+
+        actions, weights = zip(*self.mix)
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            await getattr(self, f"do_{action}")()
+
+            # Encoders pause between actions (typing, reading the screen)
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time) if self.think_time else 0)
+
+    def _remember(self, response):
+        if response is not None and response.status_code == 200:
+            for item in response.json().get("items", []):
+                self.known_ids.append(item["id"])
+                self.known_codes.append(item["resident_code"])
+            del self.known_ids[:-200], self.known_codes[:-200]
+
+    # --- actions ---
+
+    async def do_list(self):
+        page = self.rng.choice([0, 0, 0, 1, 2, 5])
+        response = await self.request("GET /residents/", "GET", "/residents/", params={"skip": page * 20, "limit": 20})
+        self._remember(response)
+
+    async def do_search(self):
+        params = {"search": self.rng.choice(SEARCH_TERMS), "limit": 20}
+        self._remember(await self.request("GET /residents/?search", "GET", "/residents/", params=params))
+
+    async def do_detail(self):
+        if not self.known_ids:
+            return await self.do_list()
+        resident_id = self.rng.choice(self.known_ids)
+        await self.request("GET /residents/{id}", "GET", f"/residents/{resident_id}")
+
+    async def do_dashboard(self):
+        await self.request("GET /dashboard/stats", "GET", "/dashboard/stats")
+
+    async def do_reference(self):
+        path = self.rng.choice(["/barangays/", "/puroks/", "/sectors/", "/relationships/"])
+        await self.request("GET reference", "GET", path)
+
+    def _new_household(self):
+        sex = self.rng.choice(["Male", "Female"])
+        last_name = self.rng.choice(LAST_NAMES)
+        return {
+            "last_name": last_name,
+            # Unique first name so the duplicate check never rejects it
+            "first_name": f"{self.rng.choice(MALE_FIRST_NAMES if sex == 'Male' else FEMALE_FIRST_NAMES)} {uuid.uuid4().hex[:6].upper()}",
+            "middle_name": self.rng.choice(LAST_NAMES),
+            "house_no": str(self.rng.randint(1, 999)),
+            "purok": f"Purok {self.rng.randint(1, 20)}",
+            "barangay": self.username,
+            "sex": sex,
+            "birthdate": f"{self.rng.randint(1940, 2005)}-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}",
+            "civil_status": "MARRIED",
+            "religion": "ROMAN CATHOLIC",
+            "contact_no": f"09{self.rng.randint(100000000, 999999999)}",
+            "sector_ids": [],
+            "family_members": [
+                {"last_name": last_name, "first_name": self.rng.choice(FEMALE_FIRST_NAMES), "relationship": "DAUGHTER"}
+                for _ in range(self.rng.randint(0, 4))
+            ],
+        }
+
+    async def do_create(self):
+        response = await self.request("POST /residents/", "POST", "/residents/", json=self._new_household())
+        if response is not None and response.status_code == 200:
+            self.known_ids.append(response.json()["id"])
+
+    async def do_update(self):
+        if not self.known_ids:
+            return await self.do_list()
+
+        resident_id = self.rng.choice(self.known_ids)
+        response = await self.request("GET /residents/{id}", "GET", f"/residents/{resident_id}")
+        if response is None or response.status_code != 200:
+            return
+
+        resident = response.json()
+        body = {
+            key: resident.get(key)
+            for key in ("last_name", "first_name", "middle_name", "ext_name", "house_no", "purok",
+                        "barangay", "sex", "birthdate", "civil_status", "religion", "occupation",
+                        "spouse_last_name", "spouse_first_name", "spouse_middle_name", "spouse_ext_name",
+                        "contact_no", "precinct_no", "other_sector_details")
+        }
+        body["contact_no"] = f"09{self.rng.randint(100000000, 999999999)}"
+        body["sector_ids"] = [s["id"] for s in resident.get("sectors") or []]
+        body["family_members"] = [
+            {k: m.get(k) for k in ("first_name", "last_name", "middle_name", "relationship")}
+            for m in resident.get("family_members") or []
+        ]
+
+        await self.request("PUT /residents/{id}", "PUT", f"/residents/{resident_id}", json=body)
+
+    async def do_qr_lookup(self):
+        if not self.known_codes:
+            return await self.do_list()
+        code = self.rng.choice(self.known_codes)
+        await self.request("GET /residents/code/{code}", "GET", f"/residents/code/{code}")
+
+    async def do_qr_verify(self):
+        if not self.known_codes:
+            return await self.do_list()
+        code = self.rng.choice(self.known_codes)
+        await self.request("GET /residents/code/{code}/verify", "GET", f"/residents/code/{code}/verify")
+
+    async def do_export(self):
+        await self.request("GET /export/excel", "GET", "/export/excel")
+
+    async def do_export_master_list(self):
+        await self.request("GET /export/master-list", "GET", "/export/master-list", params={"format": "csv"})
+
+    async def do_import(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_import_workbook(
+                os.path.join(tmp, "import.xlsx"), rows=200, seed=self.rng.randint(10000, 10 ** 9)
+            )
+            with open(path, "rb") as f:
+                content = f.read()
+
+        files = {"file": ("import.xlsx", io.BytesIO(content),
+                          "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+        await self.request("POST /import/excel", "POST", "/import/excel", files=files)
+
+
+async def run_load(args):
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.users + 5, max_keepalive_connections=args.users + 5)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        users = [
+            VirtualUser(
+                client, recorder, random.Random(rng.random()),
+                BARANGAY_USERS[i % len(BARANGAY_USERS)], args.barangay_password,
+                ENCODER_MIX, args.think_time
+            )
+            for i in range(args.users)
+        ]
+        if args.admin_password:
+            users.append(VirtualUser(
+                client, recorder, random.Random(rng.random()),
+                "admin", args.admin_password, ADMIN_MIX, args.think_time
+            ))
+
+        started = time.monotonic()
+        deadline = started + args.duration
+
+        # Stagger logins over a few seconds like a shift starting
+        async def start(user, delay):
+            await asyncio.sleep(delay)
+            await user.run(deadline)
+
+        results = await asyncio.gather(
+            *(start(user, rng.uniform(0, min(5, args.duration / 10))) for user in users),
+            return_exceptions=True
+        )
+        elapsed = time.monotonic() - started
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    for failure in failures:
+        print(f"virtual user stopped: {failure}", file=sys.stderr)
+
+    return recorder.report(elapsed), elapsed
+
+
+def print_report(rows, elapsed):
+    total = sum(r["requests"] for r in rows.values())
+    errors = sum(r["requests"] * r["error_rate"] for r in rows.values())
+
+    print(f"\n{'endpoint':30} {'reqs':>7} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'err%':>6}")
+    for name, r in rows.items():
+        print(
+            f"{name:30} {r['requests']:>7} {r['rps']:>7.2f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['error_rate'] * 100:>6.2f}"
+        )
+    print(f"\n{total} requests in {elapsed:.0f}s: {total / elapsed:.1f} req/s, "
+          f"{(errors / total * 100) if total else 0:.2f}% errors")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m perf.loadtest")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent barangay encoders")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between actions (s)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--barangay-password", default=os.getenv("BARANGAY_DEFAULT_PASSWORD"))
+    parser.add_argument("--admin-password", default=os.getenv("ADMIN_PASSWORD"))
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if not args.barangay_password:
+        parser.error("Set BARANGAY_DEFAULT_PASSWORD or pass --barangay-password")
+
+    rows, elapsed = asyncio.run(run_load(args))
+    print_report(rows, elapsed)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"users": args.users, "duration": elapsed, "endpoints": rows}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Query-count guards per endpoint.
+
+Calls each route through FastAPI's TestClient, counts the SQL
+statements it issues, and fails when a route goes over its budget or
+when a bigger result (a page of 100 instead of 10, a household with 8
+members instead of 1) costs more statements than a small one. That is
+how N+1 loads (lazy family_members, sectors, refresh after commit)
+show up before production.
+
+The export builders are also called directly, for one barangay and for
+all of them, so a cached file from export_cache cannot hide their
+queries. Their only allowed growth is the selectinload IN query per
+yield_per batch.
+
+    python -m perf.query_budget
+
+Needs a migrated database with at least a few hundred residents
+(`python -m perf.synthetic populate --residents 1000`). Writes run in
+one outer transaction that is rolled back at the end. Authentication is
+replaced by an admin principal so only the route's own queries count.
+"""
+import math
+import os
+import sys
+import tempfile
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from fastapi.testclient import TestClient
+from app import main, models
+from app.crud import apply_barangay_filter
+from app.core.database import async_engine, engine, get_db, get_read_db, read_engine
+from services import export_service, report_service
+
+# Statements issued by the rolled-back outer transaction, not the route
+_IGNORED_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(_IGNORED_PREFIXES):
+            return
+        self.count += 1
+        self.statements.append(statement.split("\n", 1)[0][:100])
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+
+def resident_body(resident, members: int):
+    return {
+        "last_name": "BUDGET",
+        "first_name": f"CHECK {members}",
+        "middle_name": "",
+        "purok": resident.purok or "Purok 1",
+        "barangay": resident.barangay,
+        "birthdate": "1990-01-01",
+        "sex": "Female",
+        "sector_ids": [],
+        "family_members": [
+            {"last_name": "BUDGET", "first_name": f"MEMBER {i}", "relationship": "DAUGHTER"}
+            for i in range(members)
+        ],
+    }
+
+
+def build_checks(db: Session):
+    """
+    (label, method, url, kwargs, budget, same_as) where same_as names an
+    earlier check that must not use fewer statements.
+    """
+    resident = db.query(models.ResidentProfile).filter(
+        models.ResidentProfile.is_deleted == False
+    ).order_by(models.ResidentProfile.id).first()
+
+    if resident is None:
+        raise SystemExit("No residents: run `python -m perf.synthetic populate` first.")
+
+    return [
+        ("list 10", "GET", "/residents/", {"params": {"limit": 10}}, 5, None),
+        ("list 100", "GET", "/residents/", {"params": {"limit": 100}}, 5, "list 10"),
+        ("search 10", "GET", "/residents/", {"params": {"limit": 10, "search": "DELA CRUZ"}}, 5, None),
+        ("search 100", "GET", "/residents/", {"params": {"limit": 100, "search": "DELA CRUZ"}}, 5, "search 10"),
+        ("barangay 100", "GET", "/residents/", {"params": {"limit": 100, "barangay": resident.barangay}}, 5, "list 10"),
+        ("detail", "GET", f"/residents/{resident.id}", {}, 2, None),
+        ("by code", "GET", f"/residents/code/{resident.resident_code}", {}, 4, None),
+        ("verify", "GET", f"/residents/code/{resident.resident_code}/verify", {}, 1, None),
+        ("archived", "GET", "/residents/archived", {}, 2, None),
+        ("dashboard", "GET", "/dashboard/stats", {}, 8, None),
+        ("barangays", "GET", "/barangays/", {}, 1, None),
+        ("sectors", "GET", "/sectors/", {}, 1, None),
+        ("create 1 member", "POST", "/residents/", {"json": resident_body(resident, 1)}, 12, None),
+        ("create 8 members", "POST", "/residents/", {"json": resident_body(resident, 8)}, 12, "create 1 member"),
+    ]
+
+
+def build_excel(db: Session, barangay_name):
+    fd, path = tempfile.mkstemp(prefix="query_budget_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        report_service.write_household_excel(db, path, barangay_name)
+    finally:
+        os.remove(path)
+
+
+def build_csv(db: Session, barangay_name):
+    for _ in export_service.stream_household_csv(db, barangay_name):
+        pass
+
+
+def export_batches(db: Session, barangay_name):
+    """yield_per batches the export reads, each with one selectinload query."""
+    query = db.query(func.count(models.ResidentProfile.id)).filter(
+        models.ResidentProfile.is_deleted == False
+    )
+    heads = apply_barangay_filter(query, barangay_name).scalar()
+    return max(math.ceil(heads / report_service.EXPORT_BATCH_SIZE), 1)
+
+
+def build_export_checks(db: Session):
+    """
+    (label, build, barangay_name, budget, same_as). The budget is per
+    yield_per batch on top of a fixed base; same_as must not use fewer
+    statements once batches are discounted.
+    """
+    barangay = db.query(models.ResidentProfile.barangay).filter(
+        models.ResidentProfile.is_deleted == False
+    ).order_by(models.ResidentProfile.id).limit(1).scalar()
+
+    return [
+        ("excel 1 barangay", build_excel, barangay, 2, None),
+        ("excel all", build_excel, None, 2, "excel 1 barangay"),
+        ("csv 1 barangay", build_csv, barangay, 2, None),
+        ("csv all", build_csv, None, 2, "csv 1 barangay"),
+    ]
+
+
+def report(label, count, budget, problems, counter, failures):
+    status = "FAIL" if problems else "ok"
+    print(f"{status:5} {label:20} {count:>3} / {budget:<3} {'; '.join(problems)}")
+
+    if problems:
+        failures.append(label)
+        for statement in counter.statements:
+            print(f"        {statement}")
+
+
+def main_check():
+    counter = StatementCounter()
+    engines = {e.sync_engine if hasattr(e, "sync_engine") else e for e in (engine, read_engine, async_engine)}
+    for e in engines:
+        event.listen(e, "before_cursor_execute", counter)
+
+    connection = engine.connect()
+    outer = connection.begin()
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+
+    admin = db.query(models.User).filter(models.User.role == "admin").first()
+    if admin is None:
+        raise SystemExit("No admin user: run `python seed.py` first.")
+
+    def session_override():
+        yield db
+
+    main.app.dependency_overrides[get_db] = session_override
+    main.app.dependency_overrides[get_read_db] = session_override
+    main.app.dependency_overrides[main.get_current_user] = lambda: main.Principal(
+        id=admin.id, username=admin.username, role="admin", token_version=""
+    )
+
+    failures = []
+    counts = {}
+
+    try:
+        checks = build_checks(db)
+        client = TestClient(main.app)
+
+        for label, method, url, kwargs, budget, same_as in checks:
+            db.expire_all()
+            counter.reset()
+
+            response = client.request(method, url, **kwargs)
+            counts[label] = counter.count
+
+            problems = []
+            if response.status_code >= 400:
+                problems.append(f"HTTP {response.status_code}")
+            if counter.count > budget:
+                problems.append(f"over budget ({counter.count} > {budget})")
+            if same_as and counter.count > counts.get(same_as, counter.count):
+                problems.append(f"grows with result size ({counts[same_as]} for '{same_as}')")
+
+            report(label, counter.count, budget, problems, counter, failures)
+
+        for label, build, barangay_name, base, same_as in build_export_checks(db):
+            batches = export_batches(db, barangay_name)
+            db.expire_all()
+            counter.reset()
+
+            build(db, barangay_name)
+            budget = base + batches
+            counts[label] = counter.count - batches
+
+            problems = []
+            if counter.count > budget:
+                problems.append(f"over budget ({counter.count} > {budget})")
+            if same_as and counts[label] > counts[same_as]:
+                problems.append(
+                    f"grows with result size ({counts[label]} vs {counts[same_as]} "
+                    f"for '{same_as}', not counting {batches} batch(es))"
+                )
+
+            report(label, counter.count, budget, problems, counter, failures)
+    finally:
+        main.app.dependency_overrides.clear()
+        db.close()
+        outer.rollback()
+        connection.close()
+        for e in engines:
+            event.remove(e, "before_cursor_execute", counter)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
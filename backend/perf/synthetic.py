@@ -0,0 +1,374 @@
+"""
+Deterministic synthetic population for benchmarks and load tests.
+
+The same --seed always produces the same households, so numbers from
+different commits are comparable. Reference data (barangays, puroks,
+sectors, relationships) must already exist: run seed.py first.
+
+    python -m perf.synthetic populate --residents 50000 --seed 7
+    python -m perf.synthetic workbook import.xlsx --rows 2000 --seed 8
+    python -m perf.synthetic reset
+
+Synthetic residents get SYN-prefixed resident codes so `reset` can
+remove them without touching real records. Each first name carries a
+letter tag derived from the seed and row index, so no two synthetic
+residents share an identity (last, first, middle name / birthdate,
+barangay) and `populate` inserts exactly the number asked for. Only
+re-running the same seed skips rows, on their resident codes.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+import xlsxwriter
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from app import models
+from app.core.barangay_scope import resident_barangay_label
+from app.core.data_version import bump_data_version
+from app.core.database import SessionLocal
+
+SYNTHETIC_CODE_PREFIX = "SYN-"
+INSERT_BATCH_SIZE = 1000
+
+LAST_NAMES = [
+    "DELA CRUZ", "SANTOS", "REYES", "GARCIA", "BAUTISTA", "MENDOZA", "OCAMPO",
+    "CASTILLO", "VILLANUEVA", "RAMOS", "AQUINO", "NAVARRO", "TORRES", "FLORES",
+    "GONZALES", "MERCADO", "DE LEON", "SORIANO", "PASCUAL", "DOMINGO", "SALAZAR",
+    "CRUZ", "FERRER", "AGUILAR", "MANALO", "DIZON", "LAXAMANA", "ESTEBAN",
+    "FARRALES", "EBUEN", "ALFEROS", "DEL ROSARIO", "MAGBANUA", "PANGILINAN",
+    "BUENAVENTURA", "CABRERA", "ESPIRITU", "LACSON", "MACASPAC", "QUIAMBAO",
+    "RAFANAN", "SIBAYAN", "TABLIZO", "UMALI", "VALDEZ", "YAMBAO", "ZAMORA",
+    "ABELLERA", "BALMORES", "CUNANAN", "DUMLAO", "GUEVARRA", "HIDALGO",
+]
+
+MALE_FIRST_NAMES = [
+    "JUAN", "JOSE", "MARK", "JOHN PAUL", "MICHAEL", "ERNESTO", "ROMMEL", "JERIC",
+    "ARNEL", "RODEL", "JAYSON", "RONALDO", "EDGARDO", "DANILO", "REYNALDO",
+    "CHRISTIAN", "KENNETH", "JOMAR", "ALDRIN", "NOEL", "RAMIL", "BENJIE",
+    "FERDINAND", "ROLANDO", "EMMANUEL", "JUN", "ANGELO", "CARLO", "RENATO",
+]
+
+FEMALE_FIRST_NAMES = [
+    "MARIA", "ANA", "MARY JOY", "KRISTINE", "JENNIFER", "ROSALIE", "MARICEL",
+    "LORNA", "MYLENE", "ANGELICA", "JASMINE", "CHERRY", "RIZA", "LEONORA",
+    "GLORIA", "TERESITA", "CORAZON", "REMEDIOS", "NORMA", "JOCELYN", "AIRA",
+    "PRINCESS", "JOANNA", "LIEZEL", "EDNA", "MARISSA", "ROWENA", "DIVINE",
+]
+
+RELIGIONS = ["ROMAN CATHOLIC"] * 8 + ["IGLESIA NI CRISTO", "BORN AGAIN", "AGLIPAYAN", "ISLAM"]
+OCCUPATIONS = [None, None, "FARMER", "FISHERMAN", "VENDOR", "DRIVER", "TEACHER",
+               "HOUSEWIFE", "LABORER", "STUDENT", "OFW", "GOVERNMENT EMPLOYEE"]
+CIVIL_STATUSES = ["SINGLE", "MARRIED", "MARRIED", "MARRIED", "WIDOWED", "LIVE-IN", "SEPARATED"]
+ASSISTANCE_TYPES = ["AICS", "4PS", "TUPAD", "MEDICAL", "BURIAL", "EDUCATIONAL"]
+ASSISTANCE_OFFICES = ["MSWDO", "DSWD", "MAYOR'S OFFICE", "DOLE"]
+
+
+# --------------------------------------------------
+# GENERATION
+# --------------------------------------------------
+
+def _birthdate(rng, min_age, max_age):
+    today = date(2025, 1, 1)  # fixed so output never depends on the run date
+    return today - timedelta(days=rng.randint(min_age * 365, max_age * 365))
+
+
+def _first_name(rng, sex):
+    return rng.choice(MALE_FIRST_NAMES if sex == "Male" else FEMALE_FIRST_NAMES)
+
+
+def _name_tag(seed: int, index: int):
+    """Letters-only tag unique per (seed, index), e.g. 'BCDA'."""
+    n = seed * 10 ** 8 + index
+    letters = ""
+    while True:
+        n, digit = divmod(n, 26)
+        letters = chr(ord("A") + digit) + letters
+        if not n:
+            return letters
+
+
+def generate_households(count: int, seed: int, barangays, puroks, sectors):
+    """
+    Yields (resident, family_members, sector_names, assistance) tuples.
+    Household sizes, ages and sector membership follow rough municipal
+    proportions; all choices come from one seeded Random.
+    """
+    rng = random.Random(seed)
+
+    for i in range(count):
+        sex = rng.choice(["Male", "Female"])
+        last_name = rng.choice(LAST_NAMES)
+        civil_status = rng.choice(CIVIL_STATUSES)
+        married = civil_status in ("MARRIED", "LIVE-IN")
+        birthdate = _birthdate(rng, 18, 90)
+
+        resident = {
+            "resident_code": f"{SYNTHETIC_CODE_PREFIX}{seed:03d}{i:08d}",
+            "last_name": last_name,
+            "first_name": f"{_first_name(rng, sex)} {_name_tag(seed, i)}",
+            "middle_name": rng.choice(LAST_NAMES),
+            "ext_name": rng.choice([None] * 15 + ["JR", "SR", "III"]),
+            "house_no": str(rng.randint(1, 999)),
+            "purok": rng.choice(puroks),
+            "barangay": resident_barangay_label(rng.choice(barangays)),
+            "birthdate": birthdate,
+            "sex": sex,
+            "civil_status": civil_status,
+            "religion": rng.choice(RELIGIONS),
+            "occupation": rng.choice(OCCUPATIONS),
+            "precinct_no": f"{rng.randint(1, 300):04d}{rng.choice('ABCD')}",
+            "contact_no": f"09{rng.randint(100000000, 999999999)}",
+            "is_deleted": rng.random() < 0.02,
+            "is_archived": False,
+            "is_family_head": True,
+            "is_active": True,
+            "status": "Active",
+        }
+
+        # Multi-row INSERT needs the same keys on every row
+        resident.update({
+            "spouse_last_name": rng.choice(LAST_NAMES) if married else None,
+            "spouse_first_name": _first_name(rng, "Female" if sex == "Male" else "Male") if married else None,
+            "spouse_middle_name": rng.choice(LAST_NAMES) if married else None,
+        })
+
+        members = []
+        if married:
+            members.append({
+                "last_name": last_name,
+                "first_name": resident["spouse_first_name"],
+                "relationship": "WIFE" if sex == "Male" else "HUSBAND",
+                "birthdate": _birthdate(rng, 18, 85),
+            })
+
+        for _ in range(min(int(rng.expovariate(1 / 2.2)), 12)):
+            child_sex = rng.choice(["Male", "Female"])
+            members.append({
+                "last_name": last_name,
+                "first_name": _first_name(rng, child_sex),
+                "relationship": "SON" if child_sex == "Male" else "DAUGHTER",
+                "birthdate": _birthdate(rng, 0, 40),
+            })
+
+        for member in members:
+            member.update({
+                "middle_name": resident["middle_name"],
+                "occupation": None,
+                "is_active": True,
+                "is_family_head": False,
+            })
+
+        age = (date(2025, 1, 1) - birthdate).days // 365
+        sector_names = set()
+        if age >= 60:
+            sector_names.add("Senior Citizen")
+        if rng.random() < 0.25 and sectors:
+            sector_names.add(rng.choice(sectors))
+
+        assistance = []
+        for _ in range(rng.choice([0, 0, 0, 1, 1, 2])):
+            processed = _birthdate(rng, 0, 3)
+            assistance.append({
+                "type_of_assistance": rng.choice(ASSISTANCE_TYPES),
+                "date_processed": processed,
+                "date_claimed": processed + timedelta(days=rng.randint(0, 30)),
+                "amount": float(rng.choice([1000, 2000, 3000, 5000, 10000])),
+                "implementing_office": rng.choice(ASSISTANCE_OFFICES),
+            })
+
+        resident["sector_summary"] = ", ".join(sorted(sector_names)) or "None"
+
+        yield resident, members, sorted(sector_names), assistance
+
+
+def _reference_data(db):
+    barangays = [name for (name,) in db.query(models.Barangay.name)]
+    puroks = [name for (name,) in db.query(models.Purok.name)]
+    sectors = {name: id for id, name in db.query(models.Sector.id, models.Sector.name)}
+
+    if not barangays or not puroks:
+        raise SystemExit("Reference data missing: run `python seed.py` first.")
+
+    return barangays, puroks, sectors
+
+
+# --------------------------------------------------
+# DATABASE
+# --------------------------------------------------
+
+def populate(residents: int, seed: int, batch_size: int = INSERT_BATCH_SIZE):
+    """Inserts `residents` synthetic households. Returns the number inserted."""
+    db = SessionLocal()
+    inserted = 0
+    started = time.monotonic()
+
+    try:
+        barangays, puroks, sector_ids = _reference_data(db)
+        households = generate_households(residents, seed, barangays, puroks, list(sector_ids))
+
+        while True:
+            batch = [h for _, h in zip(range(batch_size), households)]
+            if not batch:
+                break
+
+            rows = db.execute(
+                insert(models.ResidentProfile)
+                .values([resident for resident, _, _, _ in batch])
+                .on_conflict_do_nothing()
+                .returning(models.ResidentProfile.id, models.ResidentProfile.resident_code)
+            ).all()
+            ids = {code: id for id, code in rows}
+
+            members, links, assistance = [], [], []
+            for resident, family, sector_names, aid in batch:
+                profile_id = ids.get(resident["resident_code"])
+                if profile_id is None:
+                    continue
+                members.extend({**m, "profile_id": profile_id} for m in family)
+                links.extend(
+                    {"resident_id": profile_id, "sector_id": sector_ids[name]}
+                    for name in sector_names if name in sector_ids
+                )
+                assistance.extend({**a, "resident_id": profile_id} for a in aid)
+
+            if members:
+                db.execute(insert(models.FamilyMember).values(members))
+            if links:
+                db.execute(insert(models.resident_sectors).values(links))
+            if assistance:
+                db.execute(insert(models.ResidentAssistance).values(assistance))
+
+            db.commit()
+            inserted += len(ids)
+            print(f"  {inserted} residents ({time.monotonic() - started:.0f}s)")
+
+        bump_data_version(db, *{resident_barangay_label(b) for b in barangays})
+        db.commit()
+        db.execute(text("ANALYZE resident_profiles, family_members, resident_sectors, resident_assistance"))
+        db.commit()
+    finally:
+        db.close()
+
+    return inserted
+
+
+def reset():
+    """Deletes every synthetic resident and its dependent rows."""
+    db = SessionLocal()
+    try:
+        synthetic = "SELECT id FROM resident_profiles WHERE resident_code LIKE :prefix"
+        params = {"prefix": f"{SYNTHETIC_CODE_PREFIX}%"}
+
+        barangays = [b for (b,) in db.execute(text(
+            "SELECT DISTINCT barangay FROM resident_profiles WHERE resident_code LIKE :prefix"
+        ), params)]
+
+        for table, column in (
+            ("family_members", "profile_id"),
+            ("resident_sectors", "resident_id"),
+            ("resident_assistance", "resident_id"),
+        ):
+            db.execute(text(f"DELETE FROM {table} WHERE {column} IN ({synthetic})"), params)
+
+        deleted = db.execute(
+            text("DELETE FROM resident_profiles WHERE resident_code LIKE :prefix"), params
+        ).rowcount
+
+        bump_data_version(db, *barangays)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# IMPORT WORKBOOKS
+# --------------------------------------------------
+
+IMPORT_SECTOR_COLUMNS = ["SENIOR CITIZEN", "PWD", "SOLO PARENT", "FARMER", "FISHERFOLK", "STUDENT"]
+IMPORT_MEMBER_SLOTS = 6
+
+
+def write_import_workbook(path: str, rows: int, seed: int, barangays=None, puroks=None):
+    """
+    Writes an .xlsx in the profiling-form layout process_excel_import
+    reads (same headers, spouse as "LAST NAME.1" etc., members as
+    "N. FIRST NAME"). Needs no database.
+    """
+    barangays = barangays or ["Amagna", "Apostol", "Feria", "Rosete", "San Rafael", "Sindol"]
+    puroks = puroks or [f"Purok {n}" for n in range(1, 11)]
+
+    headers = [
+        "LAST NAME", "FIRST NAME", "MIDDLE NAME", "EXT NAME",
+        "HOUSE NO. / STREET", "PUROK/SITIO", "BARANGAY",
+        "LAST NAME", "FIRST NAME", "MIDDLE NAME", "EXT NAME",
+        "BIRTHDATE", "SEX", "CIVIL STATUS", "RELIGION", "OCCUPATION",
+        "PHONE NUMBER", "PRECINCT NUMBER",
+    ] + IMPORT_SECTOR_COLUMNS
+    for n in range(1, IMPORT_MEMBER_SLOTS + 1):
+        headers += [f"{n}. LAST NAME", f"{n}. FIRST NAME", f"{n}. MIDDLE NAME", f"{n}. RELATIONSHIP"]
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet("Profiling")
+    date_format = workbook.add_format({"num_format": "mm/dd/yyyy"})
+
+    sheet.write_row(0, 0, headers)
+
+    households = generate_households(rows, seed, barangays, puroks, [])
+    for row_index, (r, members, _, _) in enumerate(households, start=1):
+        age = (date(2025, 1, 1) - r["birthdate"]).days // 365
+        values = [
+            r["last_name"], r["first_name"], r["middle_name"], r["ext_name"],
+            r["house_no"], r["purok"], r["barangay"],
+            r.get("spouse_last_name"), r.get("spouse_first_name"), r.get("spouse_middle_name"), None,
+            None, r["sex"], r["civil_status"], r["religion"], r["occupation"],
+            r["contact_no"], r["precinct_no"],
+        ]
+        values += ["/" if (name == "SENIOR CITIZEN" and age >= 60) else None for name in IMPORT_SECTOR_COLUMNS]
+        for member in members[:IMPORT_MEMBER_SLOTS]:
+            values += [member["last_name"], member["first_name"], member["middle_name"], member["relationship"]]
+
+        sheet.write_row(row_index, 0, values)
+        sheet.write_datetime(row_index, headers.index("BIRTHDATE"), r["birthdate"], date_format)
+
+    workbook.close()
+    return path
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m perf.synthetic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("populate", help="Insert synthetic households")
+    p.add_argument("--residents", type=int, default=10000)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE)
+
+    w = commands.add_parser("workbook", help="Write an import workbook")
+    w.add_argument("path")
+    w.add_argument("--rows", type=int, default=1000)
+    w.add_argument("--seed", type=int, default=2)
+
+    commands.add_parser("reset", help="Delete all synthetic residents")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "populate":
+        print(f"Inserting {args.residents} synthetic residents (seed {args.seed})...")
+        print(f"Inserted {populate(args.residents, args.seed, args.batch_size)} residents.")
+    elif args.command == "workbook":
+        print(f"Wrote {write_import_workbook(args.path, args.rows, args.seed)}")
+    else:
+        print(f"Deleted {reset()} synthetic residents.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
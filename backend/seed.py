@@ -1,4 +1,5 @@
-from app.core.database import SessionLocal, engine
+from app.core.database import SessionLocal
+from migrations import upgrade
 import models
 from passlib.context import CryptContext
 import os
@@ -11,7 +12,7 @@ load_dotenv()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Create tables if they don't exist
-models.Base.metadata.create_all(bind=engine)
+upgrade()
 
 db = SessionLocal()
 
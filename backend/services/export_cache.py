@@ -0,0 +1,219 @@
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import NamedTuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, ReadSessionLocal
+from app.core.data_version import ALL_BARANGAYS, version_key, get_data_version
+from services import report_service, export_service
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "sanfelipe_exports")
+)
+
+# Quiet period after the last resident write before exports are rebuilt
+EXPORT_SETTLE_SECONDS = float(os.getenv("EXPORT_SETTLE_SECONDS", "30"))
+
+# How long a superseded file is kept once a newer version is published.
+# get_export may have just handed its path to a FileResponse that has
+# not opened it yet; once opened, removing it no longer matters.
+EXPORT_STALE_GRACE_SECONDS = float(os.getenv("EXPORT_STALE_GRACE_SECONDS", "300"))
+
+# Formats rebuilt in the background; others are built on first download
+EXPORT_PREBUILD_FORMATS = [
+    f.strip() for f in os.getenv("EXPORT_PREBUILD_FORMATS", "xlsx").split(",") if f.strip()
+]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_FORMATS = {
+    "xlsx": (XLSX_MEDIA_TYPE, "xlsx"),
+    "municipal": (XLSX_MEDIA_TYPE, "xlsx"),
+    **{
+        fmt: (media_type, extension)
+        for fmt, (media_type, extension, _) in export_service.EXPORT_FORMATS.items()
+    },
+}
+
+
+class CachedExport(NamedTuple):
+    path: str
+    etag: str
+    last_modified: datetime
+
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+_pending_refresh = {}
+_pending_refresh_guard = threading.Lock()
+
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def _slug(key: str):
+    if key == ALL_BARANGAYS:
+        return "ALL"
+
+    readable = re.sub(r"[^A-Z0-9]+", "_", key.replace("Ñ", "N")).strip("_")
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    return f"{readable}-{digest}"
+
+
+def _cache_path(key: str, fmt: str, version: int, day: date):
+    extension = EXPORT_FORMATS[fmt][1]
+    return os.path.join(
+        EXPORT_CACHE_DIR,
+        f"{_slug(key)}.{fmt}.v{version}.{day:%Y%m%d}.{extension}"
+    )
+
+
+def _build_lock(key: str, fmt: str):
+    with _build_locks_guard:
+        return _build_locks.setdefault((key, fmt), threading.Lock())
+
+
+def _write_export(db: Session, path: str, barangay_name: str, fmt: str):
+    if fmt == "xlsx":
+        report_service.write_household_excel(db, path, barangay_name=barangay_name)
+        return
+
+    if fmt == "municipal":
+        report_service.write_municipal_excel(db, path)
+        return
+
+    _, _, render = export_service.EXPORT_FORMATS[fmt]
+
+    with open(path, "wb") as f:
+        for chunk in render(db, barangay_name):
+            f.write(chunk)
+
+
+def _sweep_superseded(path: str, fmt: str):
+    """
+    Removes older data versions / days of the same export, each only
+    after EXPORT_STALE_GRACE_SECONDS have passed since the next newer
+    file replaced it. Never touches the newest file.
+    """
+    prefix, extension = os.path.basename(path).split(".v", 1)[0], EXPORT_FORMATS[fmt][1]
+
+    files = []
+    for candidate in glob.glob(os.path.join(EXPORT_CACHE_DIR, f"{prefix}.v*.{extension}")):
+        try:
+            files.append((os.stat(candidate).st_mtime, candidate))
+        except OSError:
+            pass
+    files.sort()
+
+    cutoff = time.time() - EXPORT_STALE_GRACE_SECONDS
+    for (_, old_path), (superseded_at, _) in zip(files, files[1:]):
+        if superseded_at < cutoff:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def _build(db: Session, path: str, barangay_name: str, fmt: str):
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+
+    # Files superseded by an earlier build; the one this build replaces
+    # stays until a later build finds it past the grace period
+    _sweep_superseded(path, fmt)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        _write_export(db, tmp_path, barangay_name, fmt)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+
+def get_export(db: Session, barangay_name: str = None, fmt: str = "xlsx"):
+    """
+    Returns the cached export for the barangay's current data version,
+    building it first if no up-to-date file exists. Files are also keyed
+    by day because the Age column depends on today's date.
+    """
+    key = version_key(barangay_name)
+    version = get_data_version(db, key)
+    path = _cache_path(key, fmt, version, date.today())
+
+    if not os.path.exists(path):
+        with _build_lock(key, fmt):
+            if not os.path.exists(path):
+                _build(db, path, barangay_name, fmt)
+
+    modified = os.stat(path).st_mtime
+
+    return CachedExport(
+        path=path,
+        etag=f'"{os.path.basename(path)}"',
+        last_modified=datetime.fromtimestamp(int(modified), timezone.utc)
+    )
+
+
+def schedule_refresh(keys):
+    """Debounced background rebuild: each new write restarts the timer."""
+    for key in keys:
+        with _pending_refresh_guard:
+            previous = _pending_refresh.pop(key, None)
+            if previous:
+                previous.cancel()
+
+            timer = threading.Timer(EXPORT_SETTLE_SECONDS, _refresh, args=(key,))
+            timer.daemon = True
+            _pending_refresh[key] = timer
+            timer.start()
+
+
+def _refresh(key: str):
+    with _pending_refresh_guard:
+        if _pending_refresh.get(key) is threading.current_thread():
+            del _pending_refresh[key]
+
+    barangay_name = None if key == ALL_BARANGAYS else key
+
+    db = ReadSessionLocal()
+    try:
+        for fmt in EXPORT_PREBUILD_FORMATS:
+            if fmt == "municipal" and key != ALL_BARANGAYS:
+                continue
+            try:
+                get_export(db, barangay_name, fmt)
+            except Exception:
+                logger.exception("Background export rebuild failed for %s (%s)", key, fmt)
+            finally:
+                db.rollback()
+    finally:
+        db.close()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _refresh_after_commit(session):
+    keys = session.info.pop("bumped_barangays", None)
+    if keys:
+        schedule_refresh(keys)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop("bumped_barangays", None)
@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+from functools import lru_cache
+from sqlalchemy.orm import Session
+from services.report_service import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_CHUNK_SIZE,
+    calculate_age,
+    count_max_family_members,
+    household_query,
+)
+
+
+PARQUET_ROW_GROUP_SIZE = 10000
+
+RECORD_FIELDS = [
+    "resident_code",
+    "barangay",
+    "purok",
+    "house_no",
+    "last_name",
+    "first_name",
+    "middle_name",
+    "ext_name",
+    "spouse_last_name",
+    "spouse_first_name",
+    "spouse_middle_name",
+    "spouse_ext_name",
+    "sex",
+    "birthdate",
+    "age",
+    "civil_status",
+    "religion",
+    "occupation",
+    "precinct_no",
+    "contact_no",
+    "sector_summary",
+    "total_members",
+]
+
+MEMBER_FIELDS = ["last_name", "first_name", "middle_name", "relationship"]
+
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def household_record(r):
+    """Plain, unformatted representation of a household for machine exports."""
+    family_members = r.family_members
+
+    return {
+        "resident_code": r.resident_code,
+        "barangay": r.barangay,
+        "purok": r.purok,
+        "house_no": r.house_no,
+        "last_name": r.last_name,
+        "first_name": r.first_name,
+        "middle_name": r.middle_name,
+        "ext_name": r.ext_name,
+        "spouse_last_name": r.spouse_last_name,
+        "spouse_first_name": r.spouse_first_name,
+        "spouse_middle_name": r.spouse_middle_name,
+        "spouse_ext_name": r.spouse_ext_name,
+        "sex": r.sex,
+        "birthdate": r.birthdate,
+        "age": calculate_age(r.birthdate) if r.birthdate else None,
+        "civil_status": r.civil_status,
+        "religion": r.religion,
+        "occupation": r.occupation,
+        "precinct_no": r.precinct_no,
+        "contact_no": r.contact_no,
+        "sector_summary": r.sector_summary,
+        "total_members": 1 + len(family_members),
+        "family_members": [
+            {field: getattr(fm, field) for field in MEMBER_FIELDS}
+            for fm in family_members
+        ],
+    }
+
+
+def iter_household_records(db: Session, barangay_name: str = None):
+    query = household_query(db, barangay_name).yield_per(EXPORT_BATCH_SIZE)
+    for r in query:
+        yield household_record(r)
+
+
+def member_columns(max_family_count):
+    return [
+        f"member_{i+1}_{field}"
+        for i in range(max_family_count)
+        for field in MEMBER_FIELDS
+    ]
+
+
+# --------------------------------------------------
+# CSV
+# --------------------------------------------------
+
+def stream_household_csv(db: Session, barangay_name: str = None):
+    """
+    Yields the master list as UTF-8 CSV chunks. Family members are
+    flattened into member_N_* columns, sized by the SQL aggregate.
+    """
+    max_family_count = count_max_family_members(db, barangay_name)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RECORD_FIELDS + member_columns(max_family_count))
+
+    for record in iter_household_records(db, barangay_name):
+        row = [record[field] for field in RECORD_FIELDS]
+
+        for i in range(max_family_count):
+            if i < len(record["family_members"]):
+                member = record["family_members"][i]
+                row.extend(member[field] for field in MEMBER_FIELDS)
+            else:
+                row.extend([None] * len(MEMBER_FIELDS))
+
+        writer.writerow(row)
+
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# --------------------------------------------------
+# NDJSON
+# --------------------------------------------------
+
+def stream_household_ndjson(db: Session, barangay_name: str = None):
+    """Yields one JSON object per household, family members nested."""
+    buffer = io.StringIO()
+
+    for record in iter_household_records(db, barangay_name):
+        buffer.write(json.dumps(record, default=str, ensure_ascii=False))
+        buffer.write("\n")
+
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# --------------------------------------------------
+# PARQUET
+# --------------------------------------------------
+
+@lru_cache(maxsize=1)
+def parquet_schema():
+    # pyarrow is large; only load it when a Parquet export is built
+    import pyarrow as pa
+
+    member_struct = pa.struct([(field, pa.string()) for field in MEMBER_FIELDS])
+
+    return pa.schema(
+        [
+            (field, pa.date32()) if field == "birthdate"
+            else (field, pa.int32()) if field in ("age", "total_members")
+            else (field, pa.string())
+            for field in RECORD_FIELDS
+        ]
+        + [("family_members", pa.list_(member_struct))]
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back to the caller.
+    tell() keeps counting across drains so the Parquet footer offsets
+    stay correct.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_household_parquet(
+    db: Session,
+    barangay_name: str = None,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE
+):
+    """Yields a Parquet file, one row group at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+
+    columns = {name: [] for name in schema.names}
+
+    def flush():
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+
+    try:
+        for record in iter_household_records(db, barangay_name):
+            for name, values in columns.items():
+                values.append(record[name])
+
+            if len(columns["resident_code"]) >= row_group_size:
+                yield flush()
+
+        if columns["resident_code"]:
+            yield flush()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+# --------------------------------------------------
+# FORMATS
+# --------------------------------------------------
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv", stream_household_csv),
+    "ndjson": ("application/x-ndjson", "ndjson", stream_household_ndjson),
+    "parquet": ("application/vnd.apache.parquet", "parquet", stream_household_parquet),
+}
@@ -0,0 +1,401 @@
+import os
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models
+from app.crud.crud import apply_barangay_filter, apply_search_filter, apply_sector_filter
+from services import qr_service
+
+# Printable resident ID cards: CR80-sized cards, 2 x 5 per A4 page. Each
+# page is rasterized (photo, text, QR) in a worker process and embedded
+# as a JPEG in a PDF that is streamed as pages finish. Photos are
+# downloaded in the parent on a small thread pool, ahead of the pages
+# that need them, so the CPU workers never wait on the network.
+ID_CARD_DPI = int(os.getenv("ID_CARD_DPI", "200"))
+ID_CARD_JPEG_QUALITY = int(os.getenv("ID_CARD_JPEG_QUALITY", "85"))
+ID_CARD_MAX_CARDS = int(os.getenv("ID_CARD_MAX_CARDS", "5000"))
+ID_CARD_PHOTO_TIMEOUT = float(os.getenv("ID_CARD_PHOTO_TIMEOUT", "3"))
+ID_CARD_PHOTO_THREADS = int(os.getenv("ID_CARD_PHOTO_THREADS", "8"))
+
+PAGE_SIZE_IN = (8.27, 11.69)       # A4
+PAGE_SIZE_PT = (595, 842)
+CARD_SIZE_IN = (85.6 / 25.4, 54 / 25.4)
+CARD_COLUMNS = 2
+CARD_ROWS = 5
+CARDS_PER_PAGE = CARD_COLUMNS * CARD_ROWS
+
+RED = (153, 27, 27)
+LIGHT_RED = (254, 202, 202)
+DARK = (17, 24, 39)
+GREY = (156, 163, 175)
+
+FONT_FILES = {
+    False: ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Arial.ttf"),
+    True: ("DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf", "Arial Bold.ttf"),
+}
+
+
+# --------------------------------------------------
+# CARD DATA
+# --------------------------------------------------
+
+def card_query(
+    db: Session,
+    barangay: str = None,
+    purok: str = None,
+    search: str = None,
+    sector: str = None
+):
+    """Column-only query for the cards, in master-list order."""
+    query = db.query(
+        models.ResidentProfile.resident_code,
+        models.ResidentProfile.last_name,
+        models.ResidentProfile.first_name,
+        models.ResidentProfile.middle_name,
+        models.ResidentProfile.ext_name,
+        models.ResidentProfile.barangay,
+        models.ResidentProfile.purok,
+        models.ResidentProfile.birthdate,
+        models.ResidentProfile.photo_url,
+    ).filter(
+        models.ResidentProfile.is_deleted == False
+    )
+
+    query = apply_barangay_filter(query, barangay)
+    query = apply_search_filter(query, search)
+    query = apply_sector_filter(query, sector)
+
+    if purok and purok.strip():
+        query = query.filter(
+            func.lower(func.trim(models.ResidentProfile.purok)) == purok.strip().lower()
+        )
+
+    # Matches ix_resident_profiles_active_barangay_name
+    return query.order_by(
+        func.upper(models.ResidentProfile.barangay),
+        func.upper(models.ResidentProfile.last_name),
+        func.upper(models.ResidentProfile.first_name)
+    )
+
+
+def load_cards(db: Session, limit: int = ID_CARD_MAX_CARDS, **filters):
+    """Plain dicts (picklable for the worker processes), at most limit + 1."""
+    return [
+        {
+            "resident_code": r.resident_code,
+            "last_name": (r.last_name or "").upper(),
+            "first_name": " ".join(p for p in (r.first_name, r.ext_name) if p).upper(),
+            "middle_name": (r.middle_name or "").upper(),
+            "barangay": (r.barangay or "").upper(),
+            "purok": (r.purok or "").upper(),
+            "birthdate": r.birthdate.isoformat() if r.birthdate else "",
+            "photo_url": r.photo_url,
+        }
+        for r in card_query(db, **filters).limit(limit + 1)
+    ]
+
+
+# --------------------------------------------------
+# PHOTOS (parent process)
+# --------------------------------------------------
+
+_photo_executor = ThreadPoolExecutor(max_workers=ID_CARD_PHOTO_THREADS, thread_name_prefix="id-photo")
+
+
+def photo_size(dpi: int = ID_CARD_DPI):
+    """Side of the square photo on a card, in pixels."""
+    card_height = round(CARD_SIZE_IN[1] * dpi)
+    return int(44 * card_height / 100)
+
+
+def fetch_photo(url: str, size: int):
+    """Photo bytes for a card, or None when there is none or it fails."""
+    if not url or not url.startswith(("http://", "https://")):
+        return None
+
+    # Ask Cloudinary for a face-centred thumbnail instead of the original
+    if "/image/upload/" in url:
+        url = url.replace("/image/upload/", f"/image/upload/c_fill,g_face,w_{size},h_{size}/", 1)
+
+    try:
+        with urllib.request.urlopen(url, timeout=ID_CARD_PHOTO_TIMEOUT) as response:
+            return response.read()
+    except Exception:
+        return None
+
+
+# --------------------------------------------------
+# RENDERING (worker processes)
+# --------------------------------------------------
+
+_fonts = {}
+
+
+def _font(size: int, bold: bool = False):
+    from PIL import ImageFont
+
+    key = (size, bold)
+    if key not in _fonts:
+        for name in FONT_FILES[bold]:
+            try:
+                _fonts[key] = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            try:
+                _fonts[key] = ImageFont.load_default(size)
+            except TypeError:   # Pillow < 10.1: fixed-size bitmap font
+                _fonts[key] = ImageFont.load_default()
+    return _fonts[key]
+
+
+def _fit(draw, text: str, font, max_width: float):
+    """Trims text with an ellipsis until it fits max_width."""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _photo_thumbnail(data: bytes, size: int):
+    from PIL import Image, ImageOps
+
+    if not data:
+        return None
+
+    try:
+        photo = Image.open(BytesIO(data))
+        photo.load()
+    except Exception:
+        return None
+
+    return ImageOps.fit(photo.convert("RGB"), (size, size))
+
+
+def _draw_card(page, card: dict, left: int, top: int, width: int, height: int):
+    from PIL import Image, ImageDraw
+
+    draw = ImageDraw.Draw(page)
+    u = height / 100
+
+    def box(x, y, w, h):
+        return [left + x * u, top + y * u, left + (x + w) * u, top + (y + h) * u]
+
+    draw.rectangle([left, top, left + width - 1, top + height - 1], outline=GREY, width=1)
+
+    # Header and footer bars
+    draw.rectangle(box(0, 0, width / u, 17), fill=RED)
+    draw.text((left + width / 2, top + 6 * u), "MUNICIPALITY OF SAN FELIPE",
+              font=_font(int(5.5 * u), True), fill="white", anchor="mm")
+    draw.text((left + width / 2, top + 12.5 * u), "PROVINCE OF ZAMBALES · OFFICIAL RESIDENT REGISTRY",
+              font=_font(int(3.2 * u), True), fill=LIGHT_RED, anchor="mm")
+
+    draw.rectangle(box(0, 91, width / u, 9), fill=RED)
+    draw.text((left + width / 2, top + 95.5 * u), "RESIDENT ID CARD",
+              font=_font(int(3.5 * u), True), fill=LIGHT_RED, anchor="mm")
+
+    # Photo
+    photo_size = int(44 * u)
+    photo_x, photo_y = int(left + 4 * u), int(top + 24 * u)
+    photo = _photo_thumbnail(card.get("photo"), photo_size)
+    if photo is not None:
+        page.paste(photo, (photo_x, photo_y))
+    else:
+        draw.text((photo_x + photo_size / 2, photo_y + photo_size / 2), "NO PHOTO",
+                  font=_font(int(3.5 * u), True), fill=GREY, anchor="mm")
+    draw.rectangle([photo_x, photo_y, photo_x + photo_size, photo_y + photo_size], outline=RED, width=max(1, int(u)))
+
+    # QR and registry ID
+    qr_size = int(52 * u)
+    qr_x, qr_y = int(left + width - 4 * u - qr_size), int(top + 20 * u)
+    qr = qr_service.render_qr(card["resident_code"], "png", max(2, qr_size // 29))
+    qr_image = Image.open(BytesIO(qr.content)).convert("RGB").resize((qr_size, qr_size), Image.NEAREST)
+    page.paste(qr_image, (qr_x, qr_y))
+    draw.text((qr_x + qr_size / 2, top + 78 * u), card["resident_code"],
+              font=_font(int(4.5 * u), True), fill=DARK, anchor="mm")
+
+    # Name and details between photo and QR
+    text_x = left + 52 * u
+    text_width = qr_x - text_x - 2 * u
+
+    def line(y, text, size, bold=True, color=DARK):
+        font = _font(int(size * u), bold)
+        draw.text((text_x, top + y * u), _fit(draw, text, font, text_width), font=font, fill=color)
+
+    line(23, f"{card['last_name']},", 5.5)
+    line(30, " ".join(p for p in (card["first_name"], card["middle_name"]) if p), 4.2)
+    line(39, "REGISTERED ADDRESS", 2.8, color=RED)
+    line(43, card["barangay"], 4)
+    line(48, card["purok"], 4)
+    if card["birthdate"]:
+        line(56, "DATE OF BIRTH", 2.8, color=RED)
+        line(60, card["birthdate"], 4)
+
+
+def render_card_page(cards: list, dpi: int = ID_CARD_DPI):
+    """
+    Worker-process half of the ID card job: draws up to CARDS_PER_PAGE
+    cards onto one A4 page and returns (jpeg bytes, width, height).
+    Each card's "photo" holds the downloaded bytes, or None.
+    """
+    from PIL import Image
+
+    page_width, page_height = (round(side * dpi) for side in PAGE_SIZE_IN)
+    card_width, card_height = (round(side * dpi) for side in CARD_SIZE_IN)
+
+    gap_x = (page_width - CARD_COLUMNS * card_width) // (CARD_COLUMNS + 1)
+    gap_y = (page_height - CARD_ROWS * card_height) // (CARD_ROWS + 1)
+
+    page = Image.new("RGB", (page_width, page_height), "white")
+
+    for i, card in enumerate(cards[:CARDS_PER_PAGE]):
+        column, row = i % CARD_COLUMNS, i // CARD_COLUMNS
+        _draw_card(
+            page, card,
+            gap_x + column * (card_width + gap_x),
+            gap_y + row * (card_height + gap_y),
+            card_width, card_height
+        )
+
+    buffer = BytesIO()
+    page.save(buffer, format="JPEG", quality=ID_CARD_JPEG_QUALITY, dpi=(dpi, dpi))
+    return buffer.getvalue(), page_width, page_height
+
+
+# --------------------------------------------------
+# PDF STREAM
+# --------------------------------------------------
+
+class _PdfWriter:
+    """
+    Minimal PDF made of full-page JPEG images, produced incrementally.
+    Pages may be added in any order; the page tree (object 2) and the
+    catalog (object 1) are written last, with Kids in page order.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.pages = {}
+        self.next_id = 3
+
+    def _emit(self, data: bytes):
+        self.offset += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: bytes):
+        self.offsets[obj_id] = self.offset
+        return self._emit(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _stream(self, obj_id: int, data: bytes, attributes: str = ""):
+        return self._object(
+            obj_id,
+            f"<< {attributes} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+        )
+
+    def header(self):
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, index: int, jpeg: bytes, width_px: int, height_px: int):
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self.pages[index] = page_id
+
+        width_pt, height_pt = PAGE_SIZE_PT
+        content = f"q {width_pt} 0 0 {height_pt} 0 0 cm /Im0 Do Q".encode()
+
+        return b"".join([
+            self._stream(
+                image_id, jpeg,
+                f"/Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} "
+                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode"
+            ),
+            self._stream(content_id, content),
+            self._object(
+                page_id,
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt} {height_pt}] "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>".encode()
+            ),
+        ])
+
+    def trailer(self):
+        kids = " ".join(f"{self.pages[i]} 0 R" for i in sorted(self.pages))
+        data = self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        data += self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.offset
+        entries = "".join(f"{self.offsets[i]:010d} 00000 n \n" for i in range(1, self.next_id))
+
+        return data + self._emit((
+            f"xref\n0 {self.next_id}\n0000000000 65535 f \n{entries}"
+            f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+        ).encode())
+
+
+def stream_id_cards_pdf(cards: list):
+    """
+    Yields the PDF for `cards`. Pages are rendered concurrently in the
+    process pool and written as each one finishes, so the download
+    starts with the first finished page rather than after the last.
+
+    At most 2 x WORKER_PROCESSES pages are in the pool at once; the next
+    is submitted as each one is written, so a 5000-card job holds a
+    window of pages in memory rather than all of them. Photos for the
+    following window are downloaded while the current one renders.
+    """
+    from app.core.workers import WORKER_PROCESSES, get_process_pool
+
+    pool = get_process_pool()
+    in_flight = 2 * WORKER_PROCESSES
+    size = photo_size()
+    pages = [cards[start:start + CARDS_PER_PAGE] for start in range(0, len(cards), CARDS_PER_PAGE)]
+
+    photos = {}     # page index -> photo download futures, one per card
+    running = {}    # render future -> page index
+
+    def prefetch(index):
+        if index < len(pages) and index not in photos:
+            photos[index] = [_photo_executor.submit(fetch_photo, card["photo_url"], size) for card in pages[index]]
+
+    def submit(index):
+        prefetch(index)
+        for ahead in range(index + 1, index + in_flight + 1):
+            prefetch(ahead)
+
+        page_cards = [
+            {**card, "photo": download.result()}
+            for card, download in zip(pages[index], photos.pop(index))
+        ]
+        running[pool.submit(render_card_page, page_cards)] = index
+
+    pdf = _PdfWriter()
+    try:
+        yield pdf.header()
+
+        next_index = 0
+        while next_index < min(in_flight, len(pages)):
+            submit(next_index)
+            next_index += 1
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                jpeg, width, height = future.result()
+                yield pdf.page(running.pop(future), jpeg, width, height)
+
+                if next_index < len(pages):
+                    submit(next_index)
+                    next_index += 1
+
+        yield pdf.trailer()
+    finally:
+        # Client went away or a page failed: drop the work not started yet
+        for future in running:
+            future.cancel()
+        for downloads in photos.values():
+            for download in downloads:
+                download.cancel()
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import tuple_
 from app.models.models import ResidentProfile, FamilyMember
+from app.core.data_version import bump_data_version
+from app.core.barangay_scope import resident_barangay_label
 
 
 # ===============================
@@ -178,7 +180,7 @@ def process_excel_import(file_content, db: Session, sheet_name=None):
             last_name = clean_str(row.get("LAST NAME")).upper()
             first_name = clean_str(row.get("FIRST NAME")).upper()
             middle_name = clean_str(row.get("MIDDLE NAME")).upper()
-            barangay = clean_str(row.get("BARANGAY")).upper()
+            barangay = resident_barangay_label(clean_str(row.get("BARANGAY"))) or ""
 
             if not last_name or not first_name:
                 continue
@@ -257,6 +259,7 @@ def process_excel_import(file_content, db: Session, sheet_name=None):
 
         try:
             result = db.execute(stmt)
+            bump_data_version(db, *{r["barangay"] for r in residents_to_insert})
             db.commit()
         except Exception as e:
             db.rollback()
@@ -299,7 +302,7 @@ def process_excel_import(file_content, db: Session, sheet_name=None):
             last_name = clean_str(row.get("LAST NAME")).upper()
             first_name = clean_str(row.get("FIRST NAME")).upper()
             middle_name = clean_str(row.get("MIDDLE NAME")).upper()
-            barangay = clean_str(row.get("BARANGAY")).upper()
+            barangay = resident_barangay_label(clean_str(row.get("BARANGAY"))) or ""
 
             if not last_name or not first_name:
                 continue
@@ -344,6 +347,7 @@ def process_excel_import(file_content, db: Session, sheet_name=None):
     if family_to_insert:
         try:
             db.execute(insert(FamilyMember).values(family_to_insert))
+            bump_data_version(db, *{k[3] for k in resident_keys_in_file})
             db.commit()
         except Exception as e:
             db.rollback()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+from typing import NamedTuple
+from app.core.cache import TTLCache
+
+# A resident's QR code encodes only the resident_code, which never
+# changes, so a rendered image is valid forever. Renders are kept in a
+# per-worker LRU and in a disk cache shared by the workers on one host.
+QR_CACHE_DIR = os.getenv(
+    "QR_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "sanfelipe_qr")
+)
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "2048"))
+
+QR_BORDER = 4
+QR_DEFAULT_BOX_SIZE = 10       # qrcode.make's default: ~290px for a short code
+QR_MIN_BOX_SIZE = 1
+QR_MAX_BOX_SIZE = 40
+
+# Bump when the rendering changes so old disk entries and browser copies
+# (served as immutable) are not reused.
+QR_RENDER_VERSION = 1
+
+QR_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+class RenderedQR(NamedTuple):
+    content: bytes
+    media_type: str
+    etag: str
+
+
+_memory_cache = TTLCache(maxsize=QR_CACHE_SIZE, ttl=24 * 3600)
+
+
+def _cache_path(resident_code: str, fmt: str, box_size: int):
+    digest = hashlib.sha1(resident_code.encode("utf-8")).hexdigest()
+    return os.path.join(
+        QR_CACHE_DIR, digest[:2],
+        f"{digest}.v{QR_RENDER_VERSION}.{box_size}.{fmt}"
+    )
+
+
+def qr_etag(resident_code: str, fmt: str, box_size: int):
+    """
+    ETag for a render, derived from its inputs rather than its bytes so
+    a conditional request can be answered without rendering.
+    """
+    key = f"{resident_code}|{fmt}|{box_size}|v{QR_RENDER_VERSION}"
+    return f'"qr-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def _render(resident_code: str, fmt: str, box_size: int):
+    import qrcode  # PIL is only needed here; keep it out of worker startup
+
+    qr = qrcode.QRCode(box_size=box_size, border=QR_BORDER)
+    qr.add_data(resident_code)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if fmt == "svg":
+        # Vector output: no rasterization, and a fraction of the PNG size
+        from qrcode.image.svg import SvgPathImage
+        qr.make_image(image_factory=SvgPathImage).save(buffer)
+    else:
+        qr.make_image().save(buffer, format="PNG")
+
+    return buffer.getvalue()
+
+
+def _write_atomic(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def render_qr(resident_code: str, fmt: str = "png", box_size: int = QR_DEFAULT_BOX_SIZE):
+    """Rendered QR for a resident code: memory cache, then disk, then qrcode."""
+    key = (resident_code, fmt, box_size)
+
+    rendered = _memory_cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    path = _cache_path(resident_code, fmt, box_size)
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError:
+        content = _render(resident_code, fmt, box_size)
+        try:
+            _write_atomic(path, content)
+        except OSError:
+            pass  # The disk cache is an optimization only
+
+    rendered = RenderedQR(
+        content=content,
+        media_type=QR_FORMATS[fmt],
+        etag=qr_etag(resident_code, fmt, box_size)
+    )
+    _memory_cache.set(key, rendered)
+    return rendered
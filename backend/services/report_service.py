@@ -1,8 +1,44 @@
-import io
-import pandas as pd
+import logging
+import os
+import pickle
+import re
+import tempfile
+import time
+from concurrent.futures import as_completed, wait
 from datetime import date
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, selectinload
 from app import models
+from app.crud import apply_barangay_filter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 1000          # Residents fetched per server-side cursor batch
+EXPORT_CHUNK_SIZE = 64 * 1024     # Bytes sent per chunk when streaming the file
+
+HOUSEHOLD_COLUMNS = [
+    "Barangay",
+    "Purok",
+    "House #",
+    "Household Head",
+    "Spouse",
+    "Sex",
+    "Birthdate",
+    "Age",
+    "Civil Status",
+    "Religion",
+    "Occupation",
+    "Precinct No",
+    "Contact",
+    "Total Members",
+    "Sectors",
+]
+
+FAMILY_FIELDS = ["LAST NAME", "FIRST NAME", "MIDDLE NAME", "RELATIONSHIP"]
+
+# Export scope for residents with no barangay recorded: they get their
+# own sheet and Summary row in the municipal workbook.
+UNASSIGNED_BARANGAY = "(UNASSIGNED)"
 
 
 # --------------------------------------------------
@@ -28,153 +64,434 @@ def excel_col_letter(col_idx):
     return letter
 
 
-# --------------------------------------------------
-# MAIN EXPORT FUNCTION
-# --------------------------------------------------
+def format_person_name(last_name, first_name, middle_name, ext_name):
+    mi = f"{middle_name[0]}." if middle_name else ""
+    return f"{last_name}, {first_name} {mi} {ext_name or ''}".strip()
+
+
+def family_columns(max_family_count):
+    return [
+        f"{i+1}. {field}"
+        for i in range(max_family_count)
+        for field in FAMILY_FIELDS
+    ]
+
+
+def apply_export_barangay(query, barangay_name: str = None):
+    if barangay_name == UNASSIGNED_BARANGAY:
+        return query.filter(or_(
+            models.ResidentProfile.barangay.is_(None),
+            func.trim(models.ResidentProfile.barangay) == ""
+        ))
+    return apply_barangay_filter(query, barangay_name)
+
+
+def count_max_family_members(db: Session, barangay_name: str = None):
+    """Largest household size among exported residents, computed in SQL."""
+    per_household = db.query(
+        func.count(models.FamilyMember.id).label("members")
+    ).join(
+        models.ResidentProfile,
+        models.ResidentProfile.id == models.FamilyMember.profile_id
+    ).filter(
+        models.ResidentProfile.is_deleted == False
+    )
+
+    per_household = apply_export_barangay(per_household, barangay_name)
+    per_household = per_household.group_by(models.FamilyMember.profile_id).subquery()
 
-def generate_household_excel(db: Session, barangay_name: str = None):
+    return db.query(func.max(per_household.c.members)).scalar() or 0
 
-    # 1️⃣ FETCH DATA
-    query = db.query(models.ResidentProfile).filter(
+
+def household_query(db: Session, barangay_name: str = None):
+    """
+    Export query for household heads. Family members are loaded with
+    selectinload, which issues one IN query per batch of heads (and works
+    with yield_per), instead of one lazy load per household.
+    """
+    query = db.query(models.ResidentProfile).options(
+        selectinload(models.ResidentProfile.family_members)
+    ).filter(
         models.ResidentProfile.is_deleted == False
     )
 
-    if barangay_name:
-        query = query.filter(
-            models.ResidentProfile.barangay.ilike(f"%{barangay_name}%")
+    query = apply_export_barangay(query, barangay_name)
+
+    # Matches ix_resident_profiles_active_barangay_name
+    return query.order_by(
+        func.upper(models.ResidentProfile.barangay),
+        func.upper(models.ResidentProfile.last_name),
+        func.upper(models.ResidentProfile.first_name)
+    )
+
+
+def household_row(r, family_members, max_family_count):
+    spouse_name = ""
+    if r.spouse_first_name:
+        spouse_name = format_person_name(
+            r.spouse_last_name, r.spouse_first_name,
+            r.spouse_middle_name, r.spouse_ext_name
         )
 
-    residents = query.order_by(
-        models.ResidentProfile.barangay,
-        models.ResidentProfile.last_name
-    ).all()
-
-    # 2️⃣ DETERMINE MAX FAMILY MEMBERS
-    max_family_count = 0
-    for r in residents:
-        max_family_count = max(max_family_count, len(r.family_members))
-
-    # 3️⃣ TRANSFORM DATA
-    data_list = []
-
-    for r in residents:
-
-        mi = f"{r.middle_name[0]}." if r.middle_name else ""
-        full_name = f"{r.last_name}, {r.first_name} {mi} {r.ext_name or ''}".strip()
-
-        spouse_name = ""
-        if r.spouse_first_name:
-            s_mi = f"{r.spouse_middle_name[0]}." if r.spouse_middle_name else ""
-            spouse_name = f"{r.spouse_last_name}, {r.spouse_first_name} {s_mi} {r.spouse_ext_name or ''}".strip()
-
-        total_members = 1 + len(r.family_members)
-
-        row = {
-            "Barangay": r.barangay,
-            "Purok": r.purok,
-            "House #": r.house_no,
-            "Household Head": full_name.upper(),
-            "Spouse": spouse_name.upper(),
-            "Sex": r.sex,
-            "Birthdate": r.birthdate,
-            "Age": calculate_age(r.birthdate),
-            "Civil Status": r.civil_status,
-            "Religion": r.religion,
-            "Occupation": r.occupation,
-            "Precinct No": r.precinct_no,
-            "Contact": r.contact_no,
-            "Total Members": total_members,
-            "Sectors": r.sector_summary,
-        }
-
-        # Dynamic Family Members
-        for i in range(max_family_count):
-            if i < len(r.family_members):
-                fm = r.family_members[i]
-                row[f"{i+1}. LAST NAME"] = fm.last_name
-                row[f"{i+1}. FIRST NAME"] = fm.first_name
-                row[f"{i+1}. MIDDLE NAME"] = fm.middle_name
-                row[f"{i+1}. RELATIONSHIP"] = fm.relationship
-            else:
-                row[f"{i+1}. LAST NAME"] = ""
-                row[f"{i+1}. FIRST NAME"] = ""
-                row[f"{i+1}. MIDDLE NAME"] = ""
-                row[f"{i+1}. RELATIONSHIP"] = ""
-
-        data_list.append(row)
-
-    df = pd.DataFrame(data_list)
-
-    # 4️⃣ GENERATE EXCEL FILE
-    output = io.BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-
-        df.to_excel(writer, sheet_name="Master_List", startrow=5, index=False)
-
-        workbook = writer.book
-        worksheet = writer.sheets["Master_List"]
-
-        worksheet.hide_gridlines(2)
-
-        # --------------------------------------------------
-        # FORMATTING
-        # --------------------------------------------------
-
-        fmt_title = workbook.add_format({
-            "bold": True,
-            "font_size": 14,
-            "align": "center"
-        })
+    row = [
+        r.barangay,
+        r.purok,
+        r.house_no,
+        format_person_name(r.last_name, r.first_name, r.middle_name, r.ext_name).upper(),
+        spouse_name.upper(),
+        r.sex,
+        r.birthdate,
+        calculate_age(r.birthdate),
+        r.civil_status,
+        r.religion,
+        r.occupation,
+        r.precinct_no,
+        r.contact_no,
+        1 + len(family_members),
+        r.sector_summary,
+    ]
+
+    for i in range(max_family_count):
+        if i < len(family_members):
+            fm = family_members[i]
+            row.extend([fm.last_name, fm.first_name, fm.middle_name, fm.relationship])
+        else:
+            row.extend(["", "", "", ""])
+
+    return row
+
+
+def iter_file_chunks(path, chunk_size=EXPORT_CHUNK_SIZE, remove=True):
+    """Yield a file in fixed-size chunks, deleting it once fully sent."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove and os.path.exists(path):
+            os.remove(path)
 
-        fmt_sub = workbook.add_format({
-            "italic": True,
-            "font_size": 11,
-            "align": "center"
-        })
 
-        fmt_header = workbook.add_format({
+# --------------------------------------------------
+# STREAMING EXPORT
+# --------------------------------------------------
+
+def _sheet_formats(workbook):
+    return {
+        "title": workbook.add_format({"bold": True, "font_size": 14, "align": "center"}),
+        "sub": workbook.add_format({"italic": True, "font_size": 11, "align": "center"}),
+        "header": workbook.add_format({
             "bold": True,
             "bg_color": "#2E8B57",
             "font_color": "white",
             "border": 1,
             "align": "center",
             "text_wrap": True
-        })
+        }),
+        "cell": workbook.add_format({"border": 1, "font_size": 10}),
+        "date": workbook.add_format({"border": 1, "font_size": 10, "num_format": "yyyy-mm-dd"}),
+    }
 
-        fmt_cell = workbook.add_format({
-            "border": 1,
-            "font_size": 10
-        })
 
-        # Title
-        last_col_letter = excel_col_letter(len(df.columns) - 1)
+def _write_sheet_header(worksheet, formats, columns, title_text):
+    # constant_memory flushes rows in order, so the title block and
+    # header must be written before any resident row.
+    worksheet.hide_gridlines(2)
+
+    last_col_letter = excel_col_letter(len(columns) - 1)
 
-        worksheet.merge_range(f"A1:{last_col_letter}1", "REPUBLIC OF THE PHILIPPINES", fmt_sub)
-        worksheet.merge_range(f"A2:{last_col_letter}2", "PROVINCE OF ZAMBALES", fmt_sub)
-        worksheet.merge_range(f"A3:{last_col_letter}3", "MUNICIPALITY OF SAN FELIPE", fmt_title)
+    worksheet.merge_range(f"A1:{last_col_letter}1", "REPUBLIC OF THE PHILIPPINES", formats["sub"])
+    worksheet.merge_range(f"A2:{last_col_letter}2", "PROVINCE OF ZAMBALES", formats["sub"])
+    worksheet.merge_range(f"A3:{last_col_letter}3", "MUNICIPALITY OF SAN FELIPE", formats["title"])
+    worksheet.merge_range(f"A4:{last_col_letter}4", title_text, formats["title"])
+
+    for col_num, column in enumerate(columns):
+        worksheet.write(5, col_num, column, formats["header"])
+
+
+def _write_sheet_row(worksheet, formats, row_num, row):
+    for col_num, value in enumerate(row):
+        if isinstance(value, date):
+            worksheet.write_datetime(row_num, col_num, value, formats["date"])
+        else:
+            worksheet.write(row_num, col_num, value, formats["cell"])
+
+
+def _track_widths(widths, row):
+    for col_num, value in enumerate(row):
+        length = len(str(value)) + 2 if value is not None else 2
+        if length > widths[col_num]:
+            widths[col_num] = length
+
+
+def write_household_excel(db: Session, path: str, barangay_name: str = None):
+    """
+    Writes the household master list to `path` without holding the
+    dataset in memory: residents are read through a server-side cursor
+    and each row goes straight to disk via xlsxwriter's constant_memory
+    mode. Column widths are tracked as rows are written.
+    """
+    import xlsxwriter
+
+    max_family_count = count_max_family_members(db, barangay_name)
+    columns = HOUSEHOLD_COLUMNS + family_columns(max_family_count)
+    widths = [len(col) + 2 for col in columns]
+
+    query = household_query(db, barangay_name).yield_per(EXPORT_BATCH_SIZE)
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+
+    try:
+        worksheet = workbook.add_worksheet("Master_List")
+        formats = _sheet_formats(workbook)
 
         title_text = f"MASTER LIST - {barangay_name.upper()}" if barangay_name else "MASTER LIST - ALL BARANGAYS"
-        worksheet.merge_range(f"A4:{last_col_letter}4", title_text, fmt_title)
+        _write_sheet_header(worksheet, formats, columns, title_text)
 
-        # Apply header style
-        for col_num, column in enumerate(df.columns):
-            worksheet.write(5, col_num, column, fmt_header)
+        row_num = 6
+        for r in query:
+            row = household_row(r, r.family_members, max_family_count)
+            _write_sheet_row(worksheet, formats, row_num, row)
+            _track_widths(widths, row)
+            row_num += 1
 
-        # Apply cell borders
-        for row_num in range(len(df)):
-            worksheet.set_row(row_num + 6, None, fmt_cell)
+        # Column widths are emitted when the workbook closes, so they can
+        # be set after all rows have been streamed.
+        for i, width in enumerate(widths):
+            worksheet.set_column(i, i, width)
 
-        # Auto column width
-        for i, col in enumerate(df.columns):
-            try:
-                max_length = df[col].fillna("").astype(str).map(len).max()
-                column_len = max(max_length, len(col)) + 2
-            except:
-                column_len = len(col) + 2
+    finally:
+        workbook.close()
 
-            worksheet.set_column(i, i, column_len)
+    return path
 
 
-    output.seek(0)
-    return output
+def generate_household_excel_file(db: Session, barangay_name: str = None):
+    """Writes the master list to a temporary .xlsx file and returns its path."""
+    fd, path = tempfile.mkstemp(prefix="sanfelipe_export_", suffix=".xlsx")
+    os.close(fd)
+
+    try:
+        return write_household_excel(db, path, barangay_name=barangay_name)
+    except Exception:
+        os.remove(path)
+        raise
+
+
+# --------------------------------------------------
+# MUNICIPAL EXPORT (ONE SHEET PER BARANGAY)
+# --------------------------------------------------
+
+# Sex is only recorded for household heads (FamilyMember has no sex
+# column), so the split is of heads, not of the total population.
+SUMMARY_COLUMNS = ["Barangay", "Households", "Family Members", "Total Population", "Male Heads", "Female Heads"]
+
+
+def list_export_barangays(db: Session):
+    """Barangays to give a sheet, then UNASSIGNED_BARANGAY if any resident has none."""
+    rows = db.query(
+        func.upper(models.ResidentProfile.barangay)
+    ).filter(
+        models.ResidentProfile.is_deleted == False
+    ).distinct().all()
+
+    names = sorted(name for (name,) in rows if name and name.strip())
+    if any(not (name or "").strip() for (name,) in rows):
+        names.append(UNASSIGNED_BARANGAY)
+    return names
+
+
+def render_barangay_sheet(barangay_name: str):
+    """
+    Worker-process half of the municipal export. Runs in a separate
+    process with its own database session, turns one barangay's
+    households into finished sheet rows, and spools them to a temp file
+    so only one household is in memory at a time.
+    """
+    from app.core.database import ReadSessionLocal
+
+    db = ReadSessionLocal()
+    fd, spool_path = tempfile.mkstemp(prefix="sanfelipe_sheet_", suffix=".pickle")
+
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            max_family_count = count_max_family_members(db, barangay_name)
+            columns = HOUSEHOLD_COLUMNS + family_columns(max_family_count)
+            widths = [len(col) + 2 for col in columns]
+
+            households = members = male_heads = female_heads = 0
+
+            query = household_query(db, barangay_name).yield_per(EXPORT_BATCH_SIZE)
+
+            for r in query:
+                row = household_row(r, r.family_members, max_family_count)
+                pickle.dump(row, spool, protocol=pickle.HIGHEST_PROTOCOL)
+                _track_widths(widths, row)
+
+                households += 1
+                members += len(r.family_members)
+                sex = (r.sex or "").strip().lower()
+                if sex in ("male", "m"):
+                    male_heads += 1
+                elif sex in ("female", "f"):
+                    female_heads += 1
+
+    except Exception:
+        os.remove(spool_path)
+        raise
+    finally:
+        db.close()
+
+    return {
+        "barangay": barangay_name,
+        "spool_path": spool_path,
+        "columns": columns,
+        "widths": widths,
+        "households": households,
+        "members": members,
+        "male_heads": male_heads,
+        "female_heads": female_heads,
+    }
+
+
+def _sheet_name(barangay_name: str, used: set):
+    name = re.sub(r"[\[\]:*?/\\]", " ", barangay_name).strip()[:31] or "Barangay"
+
+    candidate, n = name, 2
+    while candidate.upper() in used or candidate.upper() == "SUMMARY":
+        suffix = f" ({n})"
+        candidate = name[:31 - len(suffix)] + suffix
+        n += 1
+
+    used.add(candidate.upper())
+    return candidate
+
+
+def _discard_sheets(futures, spool_paths):
+    """
+    After a failure: cancels the sheets not started yet, waits for the
+    running ones (they can't be cancelled), and queues every spool file
+    they produced for removal.
+    """
+    for future in futures:
+        future.cancel()
+
+    wait(futures)
+
+    for future in futures:
+        if not future.cancelled() and future.exception() is None:
+            spool_paths.append(future.result()["spool_path"])
+
+
+def write_municipal_excel(db: Session, path: str):
+    """
+    Municipal master list with one sheet per barangay, each sized to its
+    own largest household, plus a summary sheet of counts.
+
+    Worker processes run each barangay's queries and build its rows
+    concurrently. The cell writes into the single workbook stay in this
+    process, one sheet at a time as each finishes, because xlsxwriter
+    can't merge workbooks. That serial part sets the floor for the total
+    time. It is logged here and measured by perf.bench's
+    export.excel_municipal case.
+    """
+    import xlsxwriter
+    from app.core.workers import get_process_pool
+
+    barangays = list_export_barangays(db)
+    db.rollback()   # Nothing else is read here; release the connection
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    spool_paths = []
+
+    try:
+        formats = _sheet_formats(workbook)
+        fmt_total = workbook.add_format({"bold": True, "border": 1, "font_size": 10})
+
+        summary = workbook.add_worksheet("Summary")
+
+        used_names = set()
+        sheets = {b: workbook.add_worksheet(_sheet_name(b, used_names)) for b in barangays}
+
+        started = time.perf_counter()
+        writing = 0.0
+
+        pool = get_process_pool()
+        futures = [pool.submit(render_barangay_sheet, b) for b in barangays]
+        results = {}
+
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                spool_paths.append(result["spool_path"])
+                sheet_started = time.perf_counter()
+                results[result["barangay"]] = result
+
+                # Each constant_memory sheet has its own row buffer, so sheets
+                # can be filled in completion order rather than tab order.
+                worksheet = sheets[result["barangay"]]
+                _write_sheet_header(
+                    worksheet, formats, result["columns"],
+                    f"MASTER LIST - {result['barangay']}"
+                )
+
+                with open(result["spool_path"], "rb") as spool:
+                    row_num = 6
+                    while True:
+                        try:
+                            row = pickle.load(spool)
+                        except EOFError:
+                            break
+                        _write_sheet_row(worksheet, formats, row_num, row)
+                        row_num += 1
+
+                for i, width in enumerate(result["widths"]):
+                    worksheet.set_column(i, i, width)
+
+                os.remove(result["spool_path"])
+                spool_paths.remove(result["spool_path"])
+                writing += time.perf_counter() - sheet_started
+        except BaseException:
+            _discard_sheets(futures, spool_paths)
+            raise
+
+        logger.info(
+            "Municipal export: %d sheets in %.1fs, %.1fs of it writing cells in this process",
+            len(barangays), time.perf_counter() - started, writing
+        )
+
+        # Summary sheet
+        _write_sheet_header(summary, formats, SUMMARY_COLUMNS, "MASTER LIST - SUMMARY BY BARANGAY")
+
+        totals = [0, 0, 0, 0, 0]
+        row_num = 6
+        for b in barangays:
+            result = results[b]
+            counts = [
+                result["households"],
+                result["members"],
+                result["households"] + result["members"],
+                result["male_heads"],
+                result["female_heads"],
+            ]
+            totals = [t + c for t, c in zip(totals, counts)]
+            _write_sheet_row(summary, formats, row_num, [b] + counts)
+            row_num += 1
+
+        summary.write(row_num, 0, "TOTAL", fmt_total)
+        for col_num, total in enumerate(totals, start=1):
+            summary.write(row_num, col_num, total, fmt_total)
+
+        summary.set_column(0, 0, max([len(b) for b in barangays] + [len("Barangay")]) + 2)
+        summary.set_column(1, len(SUMMARY_COLUMNS) - 1, 18)
+
+    finally:
+        workbook.close()
+        for spool_path in spool_paths:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    return path
@@ -0,0 +1,74 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import models, schemas
+from app.core.cache import TTLCache
+from app.core.database import SessionLocal
+
+# QR scan verification: the compact ResidentVerification payload for a
+# resident_code, serialized once and kept per worker. Writes through
+# this worker's sessions drop the affected codes after commit; the TTL
+# bounds staleness for writes made by other workers.
+VERIFY_CACHE_TTL = int(os.getenv("VERIFY_CACHE_TTL", "30"))
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "20000"))
+
+VERIFICATION_COLUMNS = [
+    getattr(models.ResidentProfile, name)
+    for name in schemas.ResidentVerification.model_fields
+]
+
+verification_cache = TTLCache(maxsize=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL)
+
+
+def get_verification_json(db: Session, resident_code: str):
+    """
+    JSON bytes of the resident's verification payload, or None when no
+    active resident has this code. Misses are not cached, so a newly
+    added resident verifies at once.
+    """
+    payload = verification_cache.get(resident_code)
+    if payload is not None:
+        return payload
+
+    row = db.query(*VERIFICATION_COLUMNS).filter(
+        models.ResidentProfile.resident_code == resident_code,
+        models.ResidentProfile.is_deleted == False
+    ).first()
+
+    if row is None:
+        return None
+
+    payload = schemas.ResidentVerification.model_validate(dict(row._mapping)).model_dump_json().encode()
+    verification_cache.set(resident_code, payload)
+    return payload
+
+
+def invalidate_verification(*resident_codes: str):
+    for code in resident_codes:
+        verification_cache.pop(code)
+
+
+# --------------------------------------------------
+# INVALIDATION
+# --------------------------------------------------
+
+def _remember_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.resident_code:
+        session.info.setdefault("changed_resident_codes", set()).add(target.resident_code)
+
+
+event.listen(models.ResidentProfile, "after_update", _remember_change)
+event.listen(models.ResidentProfile, "after_delete", _remember_change)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session):
+    codes = session.info.pop("changed_resident_codes", None)
+    if codes:
+        invalidate_verification(*codes)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop("changed_resident_codes", None)
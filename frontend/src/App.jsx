@@ -11,6 +11,7 @@ import UserManagement from './components/users/UserManagement';
 import ArchivedResidents from './components/residents/ArchivedResidents';
 import QRScanner from './components/pages/QRScanner';
 import ResidentQRPage from "./components/pages/ResidentQRPage";
+import api from './api/api';
 
 /**
  * DashboardLayout
@@ -60,6 +61,10 @@ export default function App() {
   };
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      api.post('/token/revoke', { refresh_token: refreshToken }).catch(() => {});
+    }
     localStorage.clear();
     setToken(null);
     setRole(null);
@@ -23,14 +23,53 @@ api.interceptors.request.use(
   }
 );
 
+// Shared refresh so a burst of expired requests triggers a single /token/refresh
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+
+    refreshPromise = (refreshToken
+      ? api.post('/token/refresh', { refresh_token: refreshToken }, { _skipRefresh: true })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refresh_token', response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // INTERCEPTOR: Runs when we get a response
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+
     // If the backend says "401 Unauthorized" (Token expired or fake)
     if (error.response && error.response.status === 401) {
-      localStorage.clear(); // Delete the bad token
-      window.location.href = '/login'; // Force them back to login
+      // Login failures and the refresh call itself are not retried
+      if (original && !original._retry && !original._skipRefresh && !original.url?.startsWith('/token')) {
+        original._retry = true;
+        try {
+          const token = await refreshAccessToken();
+          original.headers.Authorization = `Bearer ${token}`;
+          return api(original);
+        } catch {
+          // fall through to a full re-login
+        }
+      }
+
+      if (!original?.url?.startsWith('/token')) {
+        localStorage.clear(); // Delete the bad token
+        window.location.href = '/login'; // Force them back to login
+      }
     }
     return Promise.reject(error);
   }
@@ -53,6 +53,7 @@ export default function Login({ onLogin }) {
       setLockTime(0);
 
       localStorage.setItem('token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       localStorage.setItem('role', response.data.role);
 
       onLogin(response.data.role);
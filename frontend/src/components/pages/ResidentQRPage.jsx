@@ -20,7 +20,7 @@ export default function ResidentQRPage() {
 
         const qrResponse = await api.get(
           `/residents/code/${code}/qr`,
-          { responseType: "blob" }
+          { params: { format: "svg" }, responseType: "blob" }
         );
         const imageUrl = URL.createObjectURL(qrResponse.data);
         setQrImage(imageUrl);